@@ -5,4 +5,5 @@ from plumber._instructions import finalize
 from plumber._instructions import overwrite
 # from plumber._instructions import plumb
 # from plumber._instructions import plumbifexists
+from plumber._utils import applymany
 from plumber._utils import compose
@@ -1,3 +1,5 @@
+import copy
+
 from plumber.exceptions import PlumbingCollision
 
 
@@ -14,8 +16,7 @@ def payload(item):
 
 
 class Instruction(object):
-    __name__ = None
-    __parent__ = None
+    __slots__ = ('item', '__name__', '__parent__', '__weakref__')
 
     @property
     def name(self):
@@ -58,6 +59,23 @@ class Instruction(object):
             return False
         return True
 
+    def __ne__(self, right):
+        return not self == right
+
+    def __hash__(self):
+        """Consistent with equality, instructions with unhashable payloads
+        hash by class and name only
+
+            >>> hash(Instruction(1, 'a')) == hash(Instruction(1, 'a'))
+            True
+            >>> len(set([Instruction([1], 'a'), Instruction([1], 'a')]))
+            1
+        """
+        try:
+            return hash((self.__class__, self.name, self.payload))
+        except TypeError:
+            return hash((self.__class__, self.name))
+
     def __init__(self, item, name=None):
         """
             >>> class Foo: pass
@@ -71,13 +89,41 @@ class Instruction(object):
             The name can be provided here for easier testing
         """
         self.item = item
-        if name is not None:
-            self.__name__ = name
+        self.__name__ = name
+        self.__parent__ = None
+
+
+def adopt(instruction, name, parent):
+    """The instruction named name and owned by parent
+
+    An instruction already adopted by another plumber or part, or under
+    another name, is copied, the owner it was adopted by keeps it::
+
+        >>> class P(object): pass
+        >>> class Q(object): pass
+        >>> shared = default(1)
+        >>> adopt(shared, 'a', P) is shared
+        True
+        >>> b = adopt(shared, 'b', Q)
+        >>> b is shared, b.payload is shared.payload
+        (False, True)
+        >>> shared.name, shared.__parent__ is P, b.name, b.__parent__ is Q
+        ('a', True, 'b', True)
+    """
+    if instruction.__parent__ is not None and \
+            (instruction.__parent__ is not parent or
+             instruction.__name__ != name):
+        instruction = copy.copy(instruction)
+    instruction.__name__ = name
+    instruction.__parent__ = parent
+    return instruction
 
 
 class EitherOrInstruction(Instruction):
     """Instructions where either an existing value or the provided one is used
     """
+    __slots__ = ()
+
     def apply(self, dct, bases, stack):
         if stack and (stack[-1] == self):
             return False
@@ -114,6 +160,8 @@ class default(EitherOrInstruction):
         >>> dct.get('c')
         3
     """
+    __slots__ = ()
+
     def check(self, dct, bases, prev):
         return (self.name not in dct and self.name not in bases)
 
@@ -134,6 +182,8 @@ class finalize(EitherOrInstruction):
         >>> dct['b']
         3
     """
+    __slots__ = ()
+
     def check(self, dct, bases, stack):
         if self.name not in dct: return True
         if not stack or isinstance(stack[-1], finalize):
@@ -142,6 +192,8 @@ class finalize(EitherOrInstruction):
 
 
 class overwrite(EitherOrInstruction):
+    __slots__ = ()
+
     def check(self, dct, bases, stack):
         if self.name not in dct:
             return True
@@ -1,14 +1,8 @@
 from plumber.exceptions import PlumbingCollision
 from plumber._instructions import Instruction
-from plumber._instructions import plumb
-
-try:
-    from plumber._instructions import _implements
-    ZOPE_INTERFACE_AVAILABLE = True
-except ImportError: #pragma NO COVERAGE
-    # zope.testrunner depends on zope.interface
-    # XXX: how do we test without zope.interface?
-    ZOPE_INTERFACE_AVAILABLE = False #pragma NO COVERAGE
+from plumber._instructions import adopt
+from plumber.attic_instr import _implements
+from plumber.attic_instr import plumb
 
 
 class _Part(object):
@@ -17,14 +11,14 @@ class _Part(object):
 
 
 class Instructions(object):
-    """Adapter to set instructions on a part
+    """Adapter to get the instructions of a part
+
+    Classes other than parts have no instructions, nothing is set on them.
     """
     attrname = "__plumbing_instructions__"
 
     def __init__(self, part):
         self.part = part
-        if not part.__dict__.has_key(self.attrname):
-            setattr(part, self.attrname, [])
 
     def __contains__(self, item):
         return item in self.instructions
@@ -32,12 +26,9 @@ class Instructions(object):
     def __iter__(self):
         return iter(self.instructions)
 
-    def append(self, item):
-        self.instructions.append(item)
-
     @property
     def instructions(self):
-        return getattr(self.part, self.attrname)
+        return self.part.__dict__.get(self.attrname, ())
 
 
 class partmetaclass(type):
@@ -64,25 +55,24 @@ class partmetaclass(type):
         if not issubclass(cls, _Part):
             return
 
-        # Get the part's instructions list
-        instructions = Instructions(cls)
+        # The instructions are collected first and set on the part as a
+        # tuple once complete
+        instructions = []
 
         # An existing docstring is an implicit plumb instruction for __doc__
         if cls.__doc__ is not None:
             instructions.append(plumb(cls.__doc__, name='__doc__'))
 
-        # If zope.interface is available treat existence of implemented
-        # interfaces as an implicit _implements instruction with these
-        # interfaces.
-        if ZOPE_INTERFACE_AVAILABLE:
-            instructions.append(_implements(cls))
+        # Interfaces implemented by the part are an implicit _implements
+        # instruction. They are declared after the part is created, the
+        # instruction looks them up (and imports zope.interface) only when
+        # the part is used.
+        instructions.append(_implements(cls))
 
         for name, item in cls.__dict__.iteritems():
             # adopt instructions and enlist them
             if isinstance(item, Instruction):
-                item.__name__ = name
-                item.__parent__ = cls
-                instructions.append(item)
+                instructions.append(adopt(item, name, cls))
 
         # XXX: introduce C3 resolution
         # check our bases for instructions we don't have already and which
@@ -99,6 +89,8 @@ class partmetaclass(type):
                     continue
                 instructions.append(instr)
 
+        setattr(cls, Instructions.attrname, tuple(instructions))
+
 
 # Base class for plumbing parts: identification and metaclass setting
 # No doctest allowed here, it would be recognized as an instruction.
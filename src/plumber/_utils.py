@@ -1,11 +1,49 @@
+import types
+
 from plumber import Plumber
+from plumber.meta import interfacesof
+from plumber.meta import plumbclass
+from plumber.meta import plumbinstance
+from plumber.tools import curry
 
 
 def compose(*args, **kw):
-    x = args[0]
-    xs = args[1:]
-    if not xs:
-        return curry(x, **kw) if kw else x
-    if not issubclass(x, Plumber):
-        raise Exception("All except last need to be plumbers.")
-    return x(compose(*xs), **kw)
+    """Apply a chain of plumbers to a class in one pass
+
+    ``compose(f, g, X)`` has the result of ``f(g(X))``, but no intermediate
+    class ``g_X`` is created. Without a class at the end, a function applying
+    the chain is returned, to be used as class decorator. ``kw`` are curried
+    into ``__init__``. Instances are plumbed like by nested calls, see
+    ``plumbinstance``, ``kw`` are curried into ``__call__``.
+    """
+    x = args[-1]
+    plumbers = args[:-1]
+    if isinstance(x, type) and issubclass(x, Plumber):
+        plumbers = args
+        return lambda x: compose(*(plumbers + (x,)), **kw)
+    isclass = isinstance(x, (type, types.ClassType))
+    if not plumbers:
+        return curry(x, (), kw) if kw and isclass else x
+    for plumber in plumbers:
+        if not issubclass(plumber, Plumber):
+            raise Exception("All except last need to be plumbers.")
+    if not isclass:
+        return plumbinstance(tuple(plumbers), x, (), kw)
+    return plumbclass(tuple(plumbers), x, (), kw)
+
+
+def applymany(plumbers, classes, *cargs, **kw):
+    """Apply a plumber or a chain of plumbers to each of classes
+
+    The chain is resolved once and applied to each class in one pass, the
+    first plumber being applied last as with ``compose``. Returns a list of
+    the plumbing classes.
+    """
+    if not isinstance(plumbers, (tuple, list)):
+        plumbers = (plumbers,)
+    plumbers = tuple(plumbers)
+    for x in plumbers:
+        if not issubclass(x, Plumber):
+            raise Exception("Only plumbers can be applied.")
+    interfaces = interfacesof(plumbers)
+    return [plumbclass(plumbers, x, cargs, kw, interfaces) for x in classes]
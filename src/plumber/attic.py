@@ -1,9 +1,13 @@
+from plumber import profiling
 from plumber._part import Instructions
 from plumber._part import partmetaclass
+from plumber.tools import Bases
 
 
 class Stacks(object):
     """organize stacks for parsing parts, stored in the class' dict
+
+    ``seen`` indexes the instructions of the history.
     """
     attrname = "__plumbing_stacks__"
 
@@ -14,6 +18,7 @@ class Stacks(object):
         self.stages.setdefault('stage1', dict())
         self.stages.setdefault('stage2', dict())
         self.stacks.setdefault('history', [])
+        self.seen = set(self.history)
 
     stacks = property(lambda self: self.dct[self.attrname])
     stages = property(lambda self: self.stacks['stages'])
@@ -22,15 +27,98 @@ class Stacks(object):
     history = property(lambda self: self.stacks['history'])
 
 
+def parse(stacks, part):
+    """Stack the instructions of a part
+    """
+    for instruction in Instructions(part):
+        stage = stacks.stages[instruction.__stage__]
+        stack = stage.setdefault(instruction.__name__, [])
+        stacks.history.append(instruction)
+        if instruction not in stacks.seen:
+            stacks.seen.add(instruction)
+            if stack:
+                # XXX: replace by a non exception log warning
+                #if instruction.__stage__ > stack[-1].__stage__:
+                #    msg = 'Stage1 instruction %s left of stage2 '
+                #    'instruction %s. We consider deprecation of this.' \
+                #            % (stack[-1], instruction)
+                #    raise PendingDeprecationWarning(msg)
+                instruction = stack[-1] + instruction
+            stack.append(instruction)
+        #else:
+            # XXX: replace by a non exception log warning
+            #raise Warning("Dropped already seen instruction %s." % \
+            #        (instruction,))
+
+
+def stacksof(cls):
+    """The plumbing stacks of a plumbing class, rebuilt for lean ones
+    """
+    stacks = cls.__dict__.get(Stacks.attrname)
+    if stacks is not None:
+        return stacks
+    stacks = Stacks(dict())
+    for part in cls.__dict__.get('__plumbing__', ()):
+        parse(stacks, part)
+    return stacks.stacks
+
+
 class plumber(type):
     """Metaclass for plumbing creation
 
     Create and call a real plumber, for classes declaring a ``__plumbing__``
-    attribute (inheritance is not enough):
+    attribute (inheritance is not enough).
+
+    Instructions already seen are kept in the history, but not stacked again::
+
+        >>> from plumber._part import Part
+        >>> from plumber.attic_instr import plumb
+
+        >>> class Part1(Part):
+        ...     @plumb
+        ...     def foo(_next, self):
+        ...         return 2 * _next(self)
+
+        >>> class Plumbing(object):
+        ...     __metaclass__ = plumber
+        ...     __plumbing__ = Part1, Part1
+        ...     def foo(self):
+        ...         return 3
+
+        >>> Plumbing().foo()
+        6
+        >>> stacks = Plumbing.__plumbing_stacks__
+        >>> [x.name for x in stacks['history']].count('foo')
+        2
+        >>> len(stacks['stages']['stage2']['foo'])
+        1
+
+    With ``__plumbing_lean__`` set on the plumbing class, or on the metaclass
+    for all of them, the stacks are dropped once the class is built.
+    ``stacksof`` parses the parts again to rebuild them::
+
+        >>> class Lean(object):
+        ...     __metaclass__ = plumber
+        ...     __plumbing__ = Part1, Part1
+        ...     __plumbing_lean__ = True
+        ...     def foo(self):
+        ...         return 3
+
+        >>> Lean().foo()
+        6
+        >>> '__plumbing_stacks__' in Lean.__dict__
+        False
+        >>> stacks = stacksof(Lean)
+        >>> [x.name for x in stacks['history']].count('foo')
+        2
+        >>> len(stacks['stages']['stage2']['foo'])
+        1
     """
-    def __new__(meta, name, bases, dct):
+    __plumbing_lean__ = False
+
+    def __new__(meta, clsname, bases, dct):
         if not dct.has_key('__plumbing__'):
-            return type.__new__(meta, name, bases, dct)
+            return type.__new__(meta, clsname, bases, dct)
 
         # turn single part into a tuple of one part
         if type(dct['__plumbing__']) is not tuple:
@@ -41,32 +129,25 @@ class plumber(type):
 
         # parse the parts
         for part in dct['__plumbing__']:
-            for instruction in Instructions(part):
-                stage = stacks.stages[instruction.__stage__]
-                stack = stage.setdefault(instruction.__name__, [])
-                stacks.history.append(instruction)
-                if instruction not in stacks.history[:-1]:
-                    if stack:
-                        # XXX: replace by a non exception log warning
-                        #if instruction.__stage__ > stack[-1].__stage__:
-                        #    msg = 'Stage1 instruction %s left of stage2 '
-                        #    'instruction %s. We consider deprecation of this.' \
-                        #            % (stack[-1], instruction)
-                        #    raise PendingDeprecationWarning(msg)
-                        instruction = stack[-1] + instruction
-                    stack.append(instruction)
-                #else:
-                    # XXX: replace by a non exception log warning
-                    #raise Warning("Dropped already seen instruction %s." % \
-                    #        (instruction,))
-
-        # install stage1
-        for stack in stacks.stage1.values():
+            if profiling.stats is None:
+                parse(stacks, part)
+            else:
+                with profiling.measure('instructions', part):
+                    parse(stacks, part)
+
+        # install stage1, one Bases serves all instructions
+        found = Bases(*bases)
+        for name, stack in stacks.stage1.items():
             instruction = stack[-1]
-            instruction(dct, Bases(bases))
+            if profiling.stats is None:
+                instruction(dct, found)
+            else:
+                owner = '%s.%s' % (dct.get('__module__'), clsname)
+                with profiling.measure('stage1', owner, name):
+                    instruction(dct, found)
 
         # build the class and return it
-        return type.__new__(meta, name, bases, dct)
+        return type.__new__(meta, clsname, bases, dct)
 
     def __init__(cls, name, bases, dct):
         type.__init__(cls, name, bases, dct)
@@ -74,6 +155,14 @@ class plumber(type):
         if dct.has_key('__plumbing__'):
             # install stage2
             stacks = Stacks(dct)
-            for stack in stacks.stage2.values():
+            for name, stack in stacks.stage2.items():
                 instruction = stack[-1]
-                instruction(cls)
+                if profiling.stats is None:
+                    instruction(cls)
+                    continue
+                # the implicit _implements instructions declare interfaces
+                phase = 'interfaces' if name == '__interfaces__' else 'stage2'
+                with profiling.measure(phase, cls, name):
+                    instruction(cls)
+            if cls.__plumbing_lean__:
+                delattr(cls, Stacks.attrname)
@@ -1,22 +1,32 @@
 """Instructions to be used in a plumbing part's declaration
 """
+import inspect
+import operator
 import re
+import sys
 import types
+import weakref
+from functools import partial
 
-try:
-    from zope.interface import classImplements
-    from zope.interface import implementedBy
-    ZOPE_INTERFACE_AVAILABLE = True
-except ImportError: #pragma NO COVERAGE
-    ZOPE_INTERFACE_AVAILABLE = False #pragma NO COVERAGE
-
+from plumber import _instructions
+from plumber import tracing
 from plumber.exceptions import PlumbingCollision
+from plumber.profiling import ownername
+from plumber.tools import classimplements
+from plumber.tools import implementedby
+from plumber.tools import signature
 
 
 ####
 # Instruction base class and helper function
 #
 
+# without docstrings (python -OO) nothing is plumbed
+DOCSTRINGS = sys.flags.optimize < 2
+
+_PLBNEXT = re.compile("\n\s*\n\s*__plbnext__\s*\n\s*\n")
+
+
 def plumb_str(leftdoc, rightdoc):
     """helper function to plumb two doc strings together
 
@@ -74,18 +84,115 @@ def plumb_str(leftdoc, rightdoc):
         return rightdoc
     if rightdoc is None:
         return leftdoc
-    _next = re.search("\n\s*\n\s*__plbnext__\s*\n\s*\n", leftdoc)
+    _next = _PLBNEXT.search(leftdoc)
     if not _next:
         return "\n\n".join((rightdoc.rstrip(), leftdoc))
     return leftdoc.replace('__plbnext__', rightdoc.rstrip())
 
 
-class Instruction(object):
+def plumbdocs(docs):
+    """Plumb docstrings given in pipeline order in one pass
+
+        >>> print plumbdocs(('Left', None, 'Middle', 'Right'))
+        Right
+        <BLANKLINE>
+        Middle
+        <BLANKLINE>
+        Left
+    """
+    if not DOCSTRINGS:
+        return None
+    return reduce(plumb_str, docs, None)
+
+
+class lazydoc(object):
+    """A docstring plumbed from docs on first access
+
+    Used as ``__doc__`` of plumbing classes and for plumbed strings::
+
+        >>> class A(object):
+        ...     pass
+        >>> A.foo = lazydoc(('Left', 'Right'))
+        >>> print A.foo
+        Right
+        <BLANKLINE>
+        Left
+        >>> A().foo is A.foo
+        True
+    """
+    __slots__ = ('docs', 'doc')
+
+    def __init__(self, docs):
+        self.docs = tuple(docs)
+
+    def __get__(self, obj, cls=None):
+        try:
+            return self.doc
+        except AttributeError:
+            doc = self.doc = plumbdocs(self.docs)
+            return doc
+
+
+class propertydoc(object):
+    """``__doc__`` of a plumbed property, plumbed on first access
+    """
+    def __get__(self, obj, cls=None):
+        if obj is None:
+            return None
+        return obj.__dict__['lazydoc'].__get__(obj)
+
+    def __set__(self, obj, value):
+        # property.__init__ sets the docstring of its getter
+        if not isinstance(value, lazydoc):
+            value = lazydoc((value,))
+        obj.__dict__['lazydoc'] = value
+
+
+class plumbedproperty(property):
+    # the docstring of instances is plumbed from the docstrings of the
+    # properties they were plumbed from
+    __doc__ = propertydoc()
+
+
+def docsof(obj):
+    """The docstrings a plumbed obj is made of, in pipeline order
+
+        >>> docsof('foo'), docsof(None)
+        (('foo',), (None,))
+        >>> docsof(lazydoc(('foo', 'bar')))
+        ('foo', 'bar')
+        >>> def foo():
+        ...     "foo"
+        >>> docsof(foo)
+        ('foo',)
+        >>> prop = plumbedproperty()
+        >>> prop.__doc__ = lazydoc(('foo', 'bar'))
+        >>> docsof(prop)
+        ('foo', 'bar')
+    """
+    if isinstance(obj, basestring) or obj is None:
+        return (obj,)
+    if isinstance(obj, lazydoc):
+        return obj.docs
+    if isinstance(obj, plumbedproperty):
+        return obj.__dict__['lazydoc'].docs
+    docs = getattr(obj, '__plumbing_docs__', None)
+    if docs is not None:
+        return docs
+    return (getattr(obj, '__doc__', None),)
+
+
+#: types of plumbed strings
+STRINGS = (basestring, lazydoc)
+
+
+class Instruction(_instructions.Instruction):
     """Base class for all plumbing instructions
 
     An instruction works on the attribute sharing its name, parent is the part
     declaring it. An instruction declares the stage to be applied in.
     """
+    __slots__ = ()
     __stage__ = None
 
     def __repr__(self):
@@ -105,6 +212,7 @@ class Instruction(object):
 class Stage2Instruction(Instruction):
     """Instructions installed in stage2: so far only plumb
     """
+    __slots__ = ()
     __stage__ = 'stage2'
 
     def __call__(self, cls):
@@ -112,32 +220,534 @@ class Stage2Instruction(Instruction):
         """
 
 
-def entrancefor(plumbing_method, _next):
-    """An entrance for a plumbing method, given _next
+_ENTRANCE = """
+def factory(_plb_method, _plb_d, _plb_next):
+    def entrance(%(params)s):
+        return _plb_method(_plb_next, %(args)s)
+    return entrance
+"""
+
+_PLUMBING = """
+def factory(_plb_method, _plb_d, _plb_entrance):
+    def plumbing(%(params)s):
+        return _plb_method(_plb_entrance(%(first)s), %(rest)s)
+    return plumbing
+"""
+
+_factories = {}
+
 
-    The entrance returned is a closure with signature: (self, *args, **kw), it
-    wraps a call of plumbing_method curried with _next.
+def generate(template, names, ndefaults):
+    """Compile a factory for the given template and argument names
+
+    Arguments with defaults take them from ``_plb_d``. Factories are compiled
+    once per template and signature.
     """
+    key = (template, names, ndefaults)
+    try:
+        return _factories[key]
+    except KeyError:
+        pass
+    params = list(names)
+    for i in range(ndefaults):
+        idx = len(names) - ndefaults + i
+        params[idx] = "%s=_plb_d[%i]" % (names[idx], i)
+    ns = dict()
+    exec template % dict(params=', '.join(params),
+                         args=', '.join(names),
+                         first=names[0],
+                         rest=', '.join(names[1:])) in ns
+    factory = _factories[key] = ns['factory']
+    return factory
+
+
+def _varargsentrance(plumbing_method, defaults, _next):
     def entrance(self, *args, **kw):
         return plumbing_method(_next, self, *args, **kw)
-    entrance.__doc__ = plumb_str(plumbing_method.__doc__, _next.__doc__)
+    return entrance
+
+
+def _varargsplumbing(plumbing_method, defaults, entrance):
+    def plumbing(__next, self, *args, **kw):
+        return plumbing_method(entrance(__next), self, *args, **kw)
+    return plumbing
+
+
+def entrancefactory(plumbing_method):
+    """A factory ``f(_next)`` for entrances of plumbing_method
+
+    The entrances take the exact positional arguments of plumbing_method.
+    For a plumbing method taking ``*args, **kw`` or one that cannot be
+    inspected an entrance with signature ``(self, *args, **kw)`` is created,
+    the arguments are passed on as given::
+
+        >>> def p1(_next, self, key, default=None):
+        ...     return _next(self, key, default)
+        >>> def p2(_next, self, *args, **kw):
+        ...     return _next(self, *args, **kw)
+        >>> def endpoint(self, key, default=3):
+        ...     return self.get(key, default)
+
+        >>> entrance = entrancefactory(p1)(endpoint)
+        >>> inspect.getargspec(entrance)
+        ArgSpec(args=['self', 'key', 'default'], varargs=None, keywords=None,
+                defaults=(None,))
+        >>> entrance({'a': 1}, key='a')
+        1
+
+        >>> entrance = entrancefactory(p2)(endpoint)
+        >>> inspect.getargspec(entrance)
+        ArgSpec(args=['self'], varargs='args', keywords='kw', defaults=None)
+        >>> entrance({}, 'a')
+        3
+    """
+    sig = signature(plumbing_method, 2)
+    if sig is None:
+        return partial(_varargsentrance, plumbing_method, ())
+    names, defaults = sig
+    factory = generate(_ENTRANCE, ('self',) + names, len(defaults))
+    return partial(factory, plumbing_method, defaults)
+
+
+def entrancefor(plumbing_method, _next):
+    """An entrance for a plumbing method, given _next
+
+    The entrance returned is a closure, it wraps a call of plumbing_method
+    curried with _next and has the signature of plumbing_method without
+    ``_next``, see ``entrancefactory``.
+
+    The docstring is plumbed right away, unlike the ones of classes and
+    properties: a function has no hook to compute ``__doc__`` on access and
+    ``inspect.getdoc`` ignores a ``__doc__`` that is not a string.
+    """
+    entrance = entrancefactory(plumbing_method)(_next)
+    entrance.__doc__ = plumbdocs(docsof(plumbing_method) + docsof(_next))
     entrance.__name__ = plumbing_method.__name__
     return entrance
 
 
 def plumbingfor(plumbing_method, _next):
     """A plumbing method combining two plumbing methods
+
+    The entrance factory for _next is determined once, the plumbing method
+    has the signature of plumbing_method::
+
+        >>> def p1(_next, self, key):
+        ...     return _next(self, key.lower())
+        >>> def p2(_next, self, key):
+        ...     return 2 * _next(self, key)
+        >>> plumbing = plumbingfor(p1, p2)
+        >>> inspect.getargspec(plumbing).args
+        ['_next', 'self', 'key']
+        >>> plumbing(dict.__getitem__, {'abc': 3}, 'AbC')
+        6
     """
-    def plumbing(__next, self, *args, **kw):
-        return plumbing_method(
-                    entrancefor(_next, __next),
-                    self, *args, **kw
-                    )
-    plumbing.__doc__ = plumb_str(plumbing_method.__doc__, _next.__doc__)
+    entrance = entrancefactory(_next)
+    sig = signature(plumbing_method)
+    if sig is None or len(sig[0]) - len(sig[1]) < 2:
+        plumbing = _varargsplumbing(plumbing_method, (), entrance)
+    else:
+        names, defaults = sig
+        factory = generate(_PLUMBING, names, len(defaults))
+        plumbing = factory(plumbing_method, defaults, entrance)
+    if DOCSTRINGS:
+        # docstrings are plumbed once by the entrance
+        plumbing.__plumbing_docs__ = docsof(plumbing_method) + docsof(_next)
     plumbing.__name__ = plumbing_method.__name__
     return plumbing
 
 
+def compilepipeline(stages, endpoint, docs=None):
+    """A single entrance for a whole pipeline
+
+    ``stages`` are the plumbing methods in pipeline order, the first one being
+    called first, ``endpoint`` is called by the last stage. In contrast to
+    nesting ``plumbingfor``, the ``_next`` of each stage is bound once here:
+    it is a ``functools.partial`` of the following stage, which does not add a
+    python frame and is not rebuilt per call::
+
+        >>> def p1(_next, self, key):
+        ...     "p1"
+        ...     return _next(self, key.lower())
+        >>> def p2(_next, self, key):
+        ...     "p2"
+        ...     return 2 * _next(self, key)
+        >>> def endpoint(self, key):
+        ...     "endpoint"
+        ...     return self[key]
+
+        >>> entrance = compilepipeline((p1, p2), endpoint)
+        >>> entrance({'abc': 3}, 'AbC')
+        6
+        >>> entrance.__name__
+        'p1'
+
+    The docstring is the same as for the nested pipeline::
+
+        >>> print entrance.__doc__
+        endpoint
+        <BLANKLINE>
+        p2
+        <BLANKLINE>
+        p1
+        >>> entrance.__doc__ == entrancefor(plumbingfor(p1, p2), endpoint).__doc__
+        True
+
+    ``docs`` are the docstrings to plumb instead, e.g. including the ones of
+    elided stages.
+    """
+    _next = endpoint
+    for stage in reversed(stages[1:]):
+        _next = partial(stage, _next)
+    first = stages[0]
+    entrance = entrancefactory(first)(_next)
+    if docs is None:
+        docs = sum([docsof(x) for x in stages], ()) + docsof(endpoint)
+    entrance.__doc__ = plumbdocs(docs)
+    entrance.__name__ = first.__name__
+    return entrance
+
+
+_passthrough = {}
+
+
+def passesthrough(plumbing_method):
+    """Whether a plumbing method only passes its arguments to ``_next``
+
+        >>> def p1(_next, self, key, default=None):
+        ...     "docstrings are fine"
+        ...     return _next(self, key, default)
+        >>> def p2(_next, self, *args, **kw):
+        ...     return _next(self, *args, **kw)
+        >>> def p3(_next, self, key):
+        ...     return _next(self, key.lower())
+        >>> [passesthrough(x) for x in p1, p2, p3]
+        [True, True, False]
+        >>> passesthrough(lambda _next, self: _next(self))
+        True
+
+    The result is cached per code object.
+    """
+    func = getattr(plumbing_method, 'im_func', plumbing_method)
+    code = getattr(func, 'func_code', None)
+    if code is None or code.co_freevars:
+        return False
+    try:
+        return _passthrough[code]
+    except KeyError:
+        pass
+    result = _passthrough[code] = code.co_code == passthroughcode(func)
+    return result
+
+
+def passthroughcode(func):
+    """Bytecode of a pass-through function with the signature of func
+    """
+    args, varargs, varkw, defaults = inspect.getargspec(func)
+    if len(args) < 2 or [x for x in args if type(x) is not str]:
+        return None
+    params = list(args)
+    if varargs:
+        params.append('*' + varargs)
+    if varkw:
+        params.append('**' + varkw)
+    call = '%s(%s)' % (args[0], ', '.join(params[1:]))
+    if func.__name__ == '<lambda>':
+        source = 'f = lambda %s: %s\n' % (', '.join(params), call)
+    else:
+        consts = func.func_code.co_consts
+        doc = consts and isinstance(consts[0], basestring) and consts[0]
+        source = 'def f(%s):\n    %s\n    return %s\n' % (
+                ', '.join(params), repr(doc) if doc else 'pass', call)
+    ns = dict()
+    exec source in ns
+    return ns['f'].func_code.co_code
+
+
+def forwardable(plumbing_method, _next, endpoint=False):
+    """Whether a pass-through plumbing method can be replaced by _next
+
+    That is the case if it takes ``*args, **kw`` or the same arguments with
+    the same defaults as _next, a stage or the endpoint. Defaults are
+    compared by identity, equal ones like ``0`` and ``False`` differ::
+
+        >>> def p1(_next, self, key, default=None):
+        ...     return _next(self, key, default)
+        >>> def p2(_next, self, *args, **kw):
+        ...     return _next(self, *args, **kw)
+        >>> def get(self, key, default=3):
+        ...     pass
+        >>> forwardable(p1, get, True), forwardable(p2, get, True)
+        (False, True)
+        >>> forwardable(p1, p1), forwardable(p1, p2), forwardable(p1, dict.get)
+        (True, False, False)
+        >>> def p3(_next, self, key, default=0):
+        ...     return _next(self, key, default)
+        >>> def get(self, key, default=False):
+        ...     pass
+        >>> forwardable(p3, get, True)
+        False
+    """
+    func = getattr(plumbing_method, 'im_func', plumbing_method)
+    spec = inspect.getargspec(func)
+    if len(spec.args) == 2 and spec.varargs and spec.keywords:
+        return True
+    sig = signature(func, 2)
+    other = signature(_next, 1 if endpoint else 2)
+    if sig is None or other is None or sig[0] != other[0] \
+            or len(sig[1]) != len(other[1]):
+        return False
+    return all(map(operator.is_, sig[1], other[1]))
+
+
+def enabledif(condition):
+    """Declare a plumbing method a stage for some plumbing classes only
+
+    ``condition`` is the name of an attribute of the plumbing class or a
+    function called with the plumbing class. For plumbing classes with a false
+    attribute or result the stage is elided from the pipeline::
+
+        >>> from plumber.attic import plumber
+        >>> from plumber._part import Part
+
+        >>> class Lower(Part):
+        ...     @plumb
+        ...     @enabledif('lower')
+        ...     def __getitem__(_next, self, key):
+        ...         return _next(self, key.lower())
+
+        >>> class Log(Part):
+        ...     @plumb
+        ...     def __getitem__(_next, self, *args, **kw):
+        ...         return _next(self, *args, **kw)
+
+        >>> class Plumbing(dict):
+        ...     __metaclass__ = plumber
+        ...     __plumbing__ = Lower, Log
+        ...     lower = False
+
+        >>> Plumbing.__getitem__ is dict.__getitem__
+        True
+        >>> elided(Plumbing)
+        [('__getitem__', 'plumber.attic_instr.Lower', 'disabled'),
+         ('__getitem__', 'plumber.attic_instr.Log', 'pass-through')]
+
+        >>> class Plumbing(dict):
+        ...     __metaclass__ = plumber
+        ...     __plumbing__ = Lower, Log
+        ...     lower = True
+        >>> Plumbing(abc=1)['ABC']
+        1
+        >>> elided(Plumbing)
+        [('__getitem__', 'plumber.attic_instr.Log', 'pass-through')]
+    """
+    def decorate(func):
+        func.__plumbing_condition__ = condition
+        return func
+    return decorate
+
+
+# code flags of ``async def`` functions and ``types.coroutine`` generators
+CO_COROUTINE = 0x0080
+CO_ITERABLE_COROUTINE = 0x0100
+
+
+def asyncstage(func):
+    """Declare a plumbing method or endpoint asynchronous
+
+    For coroutines of frameworks that do not mark their code, e.g. generator
+    based ones, see ``isasync``.
+    """
+    func.__plumbing_async__ = True
+    return func
+
+
+def isasync(func):
+    """Whether func is asynchronous: returns something to be awaited
+
+        >>> def foo(self):
+        ...     pass
+        >>> isasync(foo), isasync(asyncstage(foo)), isasync(dict.get)
+        (False, True, False)
+    """
+    func = getattr(func, 'im_func', func)
+    if getattr(func, '__plumbing_async__', False):
+        return True
+    code = getattr(func, 'func_code', None) or getattr(func, '__code__', None)
+    return bool(code is not None and
+                code.co_flags & (CO_COROUTINE | CO_ITERABLE_COROUTINE))
+
+
+def forwardingstage(func):
+    """Declare a synchronous plumbing method to return the result of
+    ``_next`` unchanged, see ``forwards``
+    """
+    func.__plumbing_forwards__ = True
+    return func
+
+
+def forwards(func):
+    """Whether a synchronous plumbing method is declared to return what
+    ``_next`` returned
+
+    Such a stage may sit on top of asynchronous ones, it passes their
+    awaitable on. It must not handle exceptions raised by ``_next``, for an
+    awaitable they are raised only once it is awaited. Nothing is detected,
+    stages are declared with ``forwardingstage``::
+
+        >>> def lower(_next, self, key):
+        ...     return _next(self, key.lower())
+        >>> forwards(lower), forwards(forwardingstage(lower))
+        (False, True)
+    """
+    func = getattr(func, 'im_func', func)
+    return bool(getattr(func, '__plumbing_forwards__', False))
+
+
+def checkasync(name, stages, endpoint):
+    """Raise PlumbingCollision, if a stage gets a result of the wrong kind
+    from ``_next``
+
+    An asynchronous stage needs an awaitable, a synchronous one a plain
+    result, unless it returns the awaitable unchanged, see ``forwards``::
+
+        >>> def stage(_next, self):
+        ...     return 2 * _next(self)
+        >>> @forwardingstage
+        ... def lower(_next, self, key):
+        ...     return _next(self, key.lower())
+        >>> @asyncstage
+        ... def endpoint(self):
+        ...     pass
+        >>> checkasync('foo', (stage,), endpoint)
+        Traceback (most recent call last):
+          ...
+        PlumbingCollision: 'foo'
+            <function stage at 0x...>
+          collides with:
+            <function endpoint at 0x...>
+        >>> checkasync('foo', (lower, asyncstage(stage)), endpoint)
+
+    An asynchronous stage cannot await a synchronous endpoint::
+
+        >>> checkasync('foo', (asyncstage(stage),), dict.get)
+        Traceback (most recent call last):
+          ...
+        PlumbingCollision: 'foo'
+            <function stage at 0x...>
+          collides with:
+            <method 'get' of 'dict' objects>
+    """
+    _next = endpoint
+    awaitable = isasync(endpoint)
+    for stage in reversed(stages):
+        if isasync(stage):
+            if not awaitable:
+                raise PlumbingCollision(name, stage, _next)
+        elif awaitable and not forwards(stage):
+            raise PlumbingCollision(name, stage, _next)
+        _next = stage
+
+
+def documented(func, doc):
+    """A copy of function func with docstring doc
+    """
+    result = types.FunctionType(func.func_code, func.func_globals,
+                                func.__name__, func.func_defaults,
+                                func.func_closure)
+    result.__dict__.update(func.__dict__)
+    result.__doc__ = doc
+    return result
+
+
+def met(condition, cls):
+    """Whether plumbing class cls meets a condition of ``enabledif``
+    """
+    if isinstance(condition, basestring):
+        return bool(getattr(cls, condition, False))
+    return bool(condition(cls))
+
+
+# plumbing class -> [(name, part, reason), ...]
+_elided = weakref.WeakKeyDictionary()
+
+
+def elided(cls):
+    """The stages elided from the pipelines of plumbing class cls
+
+    A list of tuples of the attribute name, the part declaring the stage and
+    the reason: ``pass-through`` or ``disabled``.
+    """
+    return list(_elided.get(cls, ()))
+
+
+#: accessors of properties, in the order property takes them
+ACCESSORS = ('fget', 'fset', 'fdel')
+
+
+def missingaccessor(name):
+    """Endpoint for an accessor plumbed, but not defined by the plumbing
+    """
+    def accessor(self, *args):
+        raise AttributeError("%s of plumbed property not defined" % name)
+    return accessor
+
+
+def plumbproperty(stages, endpoint):
+    """A property with one pipeline per accessor
+
+    ``stages`` are the plumbed properties in pipeline order, ``endpoint`` the
+    property of the plumbing class. Each accessor is a ``functools.partial``
+    of its first stage, bound to the following ones: no python frame is added
+    to the stages. An accessor no stage plumbs is the one of the endpoint::
+
+        >>> def fget(_next, self):
+        ...     return 2 * _next(self)
+        >>> def endpointfget(self):
+        ...     return self.value
+        >>> def endpointfset(self, value):
+        ...     self.value = value
+
+        >>> prop = plumbproperty((property(fget), property(fget)),
+        ...                      property(endpointfget, endpointfset))
+        >>> prop.fget
+        <functools.partial object at 0x...>
+        >>> prop.fset is endpointfset
+        True
+
+        >>> class A(object):
+        ...     foo = prop
+        >>> a = A()
+        >>> a.foo = 3
+        >>> a.foo
+        12
+
+    Accessors plumbed without an endpoint raise AttributeError::
+
+        >>> def fdel(_next, self):
+        ...     _next(self)
+        >>> A.bar = plumbproperty((property(None, None, fdel),), property())
+        >>> del a.bar
+        Traceback (most recent call last):
+          ...
+        AttributeError: fdel of plumbed property not defined
+    """
+    propfuncs = []
+    for x in ACCESSORS:
+        funcs = [getattr(stage, x) for stage in stages]
+        funcs = [func for func in funcs if func is not None]
+        _next = getattr(endpoint, x)
+        if funcs and _next is None:
+            _next = missingaccessor(x)
+        for func in reversed(funcs):
+            _next = partial(func, _next)
+        propfuncs.append(_next)
+    prop = plumbedproperty(*propfuncs)
+    prop.__doc__ = lazydoc(sum([docsof(x) for x in stages], ()) +
+                           docsof(endpoint))
+    return prop
+
+
 class plumb(Stage2Instruction):
     """Plumbing of strings, methods and properties
 
@@ -149,7 +759,95 @@ class plumb(Stage2Instruction):
 
     @foo.setter
     def foo
+
+    Properties are plumbed per accessor, see ``plumbproperty``.
+
+    With ``compiled`` set, method pipelines are not built from nested
+    closures, but flattened into a single entrance in stage2, see
+    ``compilepipeline``. ``compileall`` set on the class switches all
+    pipelines, ``compiled`` set on an instruction only its own, merged
+    instructions are compiled if any of their parts asked for it::
+
+        >>> from plumber.attic import plumber
+        >>> from plumber._part import Part
+
+        >>> class Part1(Part):
+        ...     @plumb
+        ...     def __getitem__(_next, self, key):
+        ...         return _next(self, key.lower())
+
+        >>> class Part2(Part):
+        ...     @plumb
+        ...     def __getitem__(_next, self, key):
+        ...         return 2 * _next(self, key)
+        >>> Part2.__getitem__.compiled = True
+
+        >>> class Plumbing(dict):
+        ...     __metaclass__ = plumber
+        ...     __plumbing__ = Part1, Part2
+
+        >>> plb = Plumbing(abc=3)
+        >>> plb['AbC']
+        6
+        >>> [x.cell_contents for x in Plumbing.__getitem__.im_func.func_closure
+        ...  if isinstance(x.cell_contents, partial)]
+        [<functools.partial object at 0x...>]
+
+    Entrances keep the signature of the plumbing methods::
+
+        >>> inspect.getargspec(Plumbing.__getitem__).args
+        ['self', 'key']
+
+    Docstrings of parts and properties are plumbed on first access, the ones
+    of methods when the entrance is created, see ``entrancefor``::
+
+        >>> class Part1(Part):
+        ...     '''Part1
+        ...     '''
+        ...     bar = plumb(property(None, None, None, "Part1.bar"))
+
+        >>> class Plumbing(object):
+        ...     '''Plumbing
+        ...     '''
+        ...     __metaclass__ = plumber
+        ...     __plumbing__ = Part1
+        ...     bar = property(None, None, None, "Plumbing.bar")
+
+        >>> Plumbing.__dict__['__doc__']
+        <plumber.attic_instr.lazydoc object at 0x...>
+        >>> print Plumbing.__doc__
+        Plumbing
+        <BLANKLINE>
+        Part1
+        <BLANKLINE>
+        >>> print Plumbing.bar.__doc__
+        Plumbing.bar
+        <BLANKLINE>
+        Part1.bar
     """
+    __slots__ = ('_stages', '_owners', '_compiled')
+    compileall = False
+
+    def _getcompiled(self):
+        return getattr(self, '_compiled', None) or self.compileall
+
+    def _setcompiled(self, value):
+        self._compiled = value
+
+    compiled = property(_getcompiled, _setcompiled)
+
+    @property
+    def stages(self):
+        """The plumbing methods merged into this instruction, in order
+        """
+        return getattr(self, '_stages', None) or (self.payload,)
+
+    @property
+    def owners(self):
+        """The parts declaring the stages, in order
+        """
+        return getattr(self, '_owners', None) or (self.__parent__,)
+
     def __add__(self, right):
         """
             >>> plb1 = plumb(1)
@@ -159,27 +857,31 @@ class plumb(Stage2Instruction):
             >>> plb1 + Instruction(1)
             Traceback (most recent call last):
               ...
-            PlumbingCollision:
+            PlumbingCollision: 'None'
                 <plumb 'None' of None payload=1>
-              with:
+              collides with:
                 <Instruction 'None' of None payload=1>
 
             >>> plumb(lambda x: None) + plumb(property(lambda x: None))
             Traceback (most recent call last):
               ...
-            PlumbingCollision:
+            PlumbingCollision: 'None'
                 <plumb 'None' of None payload=<function <lambda> at 0x...>>
-              with:
+              collides with:
                 <plumb 'None' of None payload=<property object at 0x...>>
         """
         if self == right:
             return self
         if not isinstance(right, plumb):
-            raise PlumbingCollision(self, right)
+            raise PlumbingCollision(self.name, self, right)
         if not self.ok(self.payload, right.payload):
-            raise PlumbingCollision(self, right)
-        return plumb(self.plumb(plumbingfor, self.payload, right.payload),
-                     name=self.name)
+            raise PlumbingCollision(self.name, self, right)
+        merged = plumb(self.plumb(plumbingfor, self.payload, right.payload),
+                       name=self.name)
+        merged._stages = self.stages + right.stages
+        merged._owners = self.owners + right.owners
+        merged.compiled = self.compiled or right.compiled
+        return merged
 
     def ok(self, p1, p2):
         """Check whether we can merge two payloads
@@ -187,14 +889,14 @@ class plumb(Stage2Instruction):
             >>> plumb(1) + plumb(2)
             Traceback (most recent call last):
               ...
-            PlumbingCollision:
+            PlumbingCollision: 'None'
                 <plumb 'None' of None payload=1>
-              with:
+              collides with:
                 <plumb 'None' of None payload=2>
 
         """
-        if isinstance(p1, basestring):
-            return isinstance(p2, basestring) or p2 is None
+        if isinstance(p1, STRINGS):
+            return isinstance(p2, STRINGS) or p2 is None
         if isinstance(p1, property):
             return isinstance(p2, property)
         if callable(p1):
@@ -202,23 +904,23 @@ class plumb(Stage2Instruction):
         return False
 
     def plumb(self, plbfunc, p1, p2):
-        if isinstance(p1, basestring):
-            return plumb_str(p1, p2)
+        if isinstance(p1, STRINGS):
+            return lazydoc(docsof(p1) + docsof(p2))
         if isinstance(p1, property):
-            # XXX: This should be split up into instructions during part
-            # parsing to enable two stages and all instructions
+            # accessors plumbed by one side only are taken as they are
             propfuncs = []
-            for x in 'fget', 'fset', 'fdel':
+            for x in ACCESSORS:
                 p1func = getattr(p1, x)
                 p2func = getattr(p2, x)
-                if p2func is None:
+                if p1func is None:
+                    propfuncs.append(p2func)
+                elif p2func is None:
                     propfuncs.append(p1func)
-                elif type(p2func) is extend:
-                    propfuncs.append(p2func.payload)
                 else:
                     propfuncs.append(plbfunc(p1func, p2func))
-            propfuncs.append(plumb_str(p1.__doc__, p2.__doc__))
-            return p1.__class__(*propfuncs)
+            prop = plumbedproperty(*propfuncs)
+            prop.__doc__ = lazydoc(docsof(p1) + docsof(p2))
+            return prop
         if callable(p1):
             return plbfunc(p1, p2)
         raise RuntimeError("We should not reach this code!") #pragma NO COVERAGE
@@ -227,14 +929,157 @@ class plumb(Stage2Instruction):
         # Check for a method on the plumbing class itself.
         _next = getattr(cls, self.name)
         if not self.ok(self.payload, _next):
-            raise PlumbingCollision(self, cls)
-        entrance = self.plumb(entrancefor, self.payload, _next)
+            raise PlumbingCollision(self.name, self, cls)
+        if isinstance(self.payload, property):
+            setattr(cls, self.name, plumbproperty(self.stages, _next))
+            return
+        if not self.pipelined(self.payload):
+            entrance = self.plumb(entrancefor, self.payload, _next)
+            setattr(cls, self.name, entrance)
+            return
+        endpoint = _next
+        if getattr(_next, 'im_self', True) is None:
+            # unbound method, the pipeline passes self itself
+            endpoint = _next.im_func
+        stages, elisions, docs = self.enabled(cls, endpoint)
+        if not stages and docs[:-1] != (None,) * (len(docs) - 1):
+            # the docstrings of elided stages need an entrance to live on
+            if isinstance(endpoint, types.FunctionType):
+                _elided.setdefault(cls, []).extend(elisions)
+                entrance = documented(endpoint, plumbdocs(docs))
+                entrance.__plumbing_endpoint__ = endpoint
+                setattr(cls, self.name, entrance)
+                return
+            stages, elisions, docs = self.enabled(cls, endpoint, False)
+        if elisions:
+            _elided.setdefault(cls, []).extend(elisions)
+        if not stages:
+            # all stages elided, the endpoint stays in place
+            return
+        stages = tuple(x[0] for x in stages)
+        # async pipelines are compiled, each stage is one coroutine frame
+        checkasync(self.name, stages, endpoint)
+        if self.compiled or len(stages) < len(self.stages) \
+                or isasync(endpoint):
+            entrance = compilepipeline(stages, endpoint, docs)
+        else:
+            entrance = self.plumb(entrancefor, self.payload, _next)
+        # batch entrances need the endpoint behind the pipeline
+        entrance.__plumbing_endpoint__ = endpoint
         setattr(cls, self.name, entrance)
+        tracing.register(cls, self.name, self, endpoint, entrance)
+
+    def enabled(self, cls, endpoint, elide=None):
+        """The stages of the pipeline not elided for plumbing class cls
+
+        Returns pairs of stage and owner part, the elisions, see ``elided``,
+        and the docstrings of the pipeline. Stages with a condition not met
+        by cls are elided. So are stages that only pass their arguments to
+        the next stage or endpoint, see ``forwardable``, unless cls sets
+        ``__plumbing_elide__`` to False. Their docstrings are kept::
+
+            >>> from plumber.attic import plumber
+            >>> from plumber._part import Part
+
+            >>> class Default(Part):
+            ...     @plumb
+            ...     def get(_next, self, key, default=None):
+            ...         "Default"
+            ...         return _next(self, key, default)
+
+            >>> class Plumbing(object):
+            ...     __metaclass__ = plumber
+            ...     __plumbing__ = Default
+            ...     def get(self, key, default=None):
+            ...         "Plumbing"
+            ...         return default
+
+            >>> elided(Plumbing)
+            [('get', 'plumber.attic_instr.Default', 'pass-through')]
+            >>> get = Plumbing.get.im_func
+            >>> get.func_code is get.__plumbing_endpoint__.func_code
+            True
+            >>> print Plumbing.get.__doc__
+            Plumbing
+            <BLANKLINE>
+            Default
+
+        A stage with other defaults than its next one is kept::
+
+            >>> class Plumbing(object):
+            ...     __metaclass__ = plumber
+            ...     __plumbing__ = Default
+            ...     def get(self, key, default=3):
+            ...         return default
+            >>> elided(Plumbing), Plumbing().get('x')
+            ([], None)
+
+            >>> class Plumbing(object):
+            ...     __metaclass__ = plumber
+            ...     __plumbing__ = Default
+            ...     __plumbing_elide__ = False
+            ...     def get(self, key, default=None):
+            ...         return default
+            >>> elided(Plumbing)
+            []
+        """
+        if elide is None:
+            elide = getattr(cls, '__plumbing_elide__', True)
+        stages = []
+        elisions = []
+        docs = []
+        _next = endpoint
+        for stage, owner in reversed(zip(self.stages, self.owners)):
+            condition = getattr(stage, '__plumbing_condition__', None)
+            if condition is not None and not met(condition, cls):
+                reason = 'disabled'
+            elif elide and passesthrough(stage) and \
+                    forwardable(stage, _next, _next is endpoint):
+                reason = 'pass-through'
+                docs.append(docsof(stage))
+            else:
+                stages.append((stage, owner))
+                docs.append(docsof(stage))
+                _next = stage
+                continue
+            elisions.append((self.name, ownername(owner), reason))
+        stages.reverse()
+        elisions.reverse()
+        docs = sum(reversed(docs), ()) + docsof(endpoint)
+        return stages, elisions, docs
+
+    def traced(self, cls, endpoint):
+        """An entrance recording the calls of each stage, see ``tracing``
+        """
+        stages, elisions, docs = self.enabled(cls, endpoint)
+        owners = [x[1] for x in stages]
+        stages = tuple(x[0] for x in stages)
+        labels = [ownername(x) for x in owners] + [ownername(cls)]
+        funcs = stages + (endpoint,)
+        records = tracing.recordsfor(cls, self.name, zip(labels, funcs))
+        _next = partial(tracing.traced(endpoint, records[-1], True), None)
+        for stage, record in reversed(zip(stages, records)[1:]):
+            _next = partial(tracing.traced(stage, record), _next)
+        first = tracing.traced(stages[0], records[0])
+        entrance = entrancefactory(first)(_next)
+        entrance.__doc__ = plumbdocs(docs)
+        entrance.__name__ = self.name
+        entrance.__plumbing_traced__ = True
+        entrance.__plumbing_endpoint__ = endpoint
+        return entrance
+
+    def pipelined(self, payload):
+        """Whether the payload is plumbed as a method pipeline
+        """
+        return not isinstance(payload, STRINGS + (property,)) \
+            and callable(payload)
 
 
 class plumbifexists(plumb):
     """Only plumb, if an end point exists
     """
+    __slots__ = ()
+
     def __call__(self, cls):
         try:
             super(plumbifexists, self).__call__(cls)
@@ -242,58 +1087,515 @@ class plumbifexists(plumb):
             pass
 
 
-if ZOPE_INTERFACE_AVAILABLE:
-    class _implements(Stage2Instruction):
-        """classImplements interfaces
+_SEGMENT = """
+def factory(%(funcs)s):
+    def segment(self, iterable):
+        for item in iterable:
+%(body)s
+            yield item
+    return segment
+"""
 
-            >>> foo = _implements(('foo',))
-            >>> foo == foo
-            True
-            >>> foo + foo is foo
-            True
+_segments = {}
 
-            >>> foo == _implements(('foo',))
-            True
-            >>> foo != _implements(('bar',))
-            True
 
-            >>> _implements(('foo', 'bar')) == _implements(('bar', 'foo'))
-            True
+def segmentfor(stages):
+    """One generator running element-wise stages in a single loop
 
-            >>> foo + _implements(('foo',)) is foo
-            True
+    ``stages`` are pairs of kind and function in the order items pass them:
+    ``filter`` stages drop items they return false for, ``map`` stages
+    replace them::
+
+        >>> segment = segmentfor((('filter', lambda self, x: x % 2),
+        ...                       ('map', lambda self, x: x * 10)))
+        >>> list(segment(None, range(5)))
+        [10, 30]
+
+    The generated code is compiled once per sequence of kinds.
+    """
+    kinds = tuple(x[0] for x in stages)
+    try:
+        factory = _segments[kinds]
+    except KeyError:
+        lines = []
+        for i, kind in enumerate(kinds):
+            if kind == 'filter':
+                lines.append("if not _plb_%i(self, item): continue" % i)
+            else:
+                lines.append("item = _plb_%i(self, item)" % i)
+        ns = dict()
+        exec _SEGMENT % dict(
+            funcs=', '.join('_plb_%i' % i for i in range(len(kinds))),
+            body='\n'.join(' ' * 12 + x for x in lines)) in ns
+        factory = _segments[kinds] = ns['factory']
+    return factory(*[x[1] for x in stages])
+
+
+def streamfor(stages, endpoint):
+    """An entrance streaming the iterable of endpoint through stages
+
+    ``stages`` are pairs of kind and function in pipeline order, items pass
+    them from the last one to the first one, as results pass ``plumb``
+    stages. Consecutive ``filter`` and ``map`` stages are fused into one
+    loop, ``generator`` stages get the iterable and return one.
+    """
+    segments = []
+    elementwise = []
+    for kind, func in reversed(stages):
+        if kind != 'generator':
+            elementwise.append((kind, func))
+            continue
+        if elementwise:
+            segments.append(segmentfor(elementwise))
+            elementwise = []
+        segments.append(func)
+    if elementwise:
+        segments.append(segmentfor(elementwise))
+
+    def entrance(self, *args, **kw):
+        iterable = endpoint(self, *args, **kw)
+        for segment in segments:
+            iterable = segment(self, iterable)
+        return iterable
+    entrance.__doc__ = plumbdocs(
+            sum([docsof(x[1]) for x in stages], ()) + docsof(endpoint))
+    entrance.__name__ = getattr(endpoint, '__name__', 'entrance')
+    return entrance
+
+
+class stream(Stage2Instruction):
+    """Streaming pipelines for methods returning iterables
+
+    Each part contributes an element-wise stage, ``stream.filter`` and
+    ``stream.map`` take ``(self, item)``, or a generator stage, ``stream``
+    takes ``(self, iterable)``. The stages are fused into one lazy generator
+    over the iterable returned by the endpoint, element-wise stages share one
+    loop::
+
+        >>> from plumber.attic import plumber
+        >>> from plumber._part import Part
+
+        >>> class Public(Part):
+        ...     @stream.filter
+        ...     def keys(self, key):
+        ...         return not key.startswith('_')
+
+        >>> class Upper(Part):
+        ...     @stream.map
+        ...     def keys(self, key):
+        ...         return key.upper()
+
+        >>> class Plumbing(dict):
+        ...     __metaclass__ = plumber
+        ...     __plumbing__ = Upper, Public
+
+        >>> plb = Plumbing(a=1, _b=2, c=3)
+        >>> keys = plb.keys()
+        >>> keys
+        <generator object segment at 0x...>
+        >>> sorted(keys)
+        ['A', 'C']
+
+    Items pass the stages from right to left, as results pass ``plumb``
+    stages, here ``Public`` filters before ``Upper`` maps::
+
+        >>> class Pairs(Part):
+        ...     @stream
+        ...     def keys(self, iterable):
+        ...         for key in iterable:
+        ...             yield key, key
 
-            >>> bar = _implements(('bar',))
-            >>> foo + bar
-            <_implements '__interfaces__' of None payload=('bar', 'foo')>
+        >>> class Plumbing(dict):
+        ...     __metaclass__ = plumber
+        ...     __plumbing__ = Pairs, Upper, Public
+        >>> sorted(Plumbing(a=1, _b=2).keys())
+        [('A', 'A')]
 
-            >>> foo + bar == bar + foo
+    Streams do not combine with other instructions::
+
+        >>> stream(len) + plumb(len)
+        Traceback (most recent call last):
+          ...
+        PlumbingCollision: 'None'
+            <stream 'None' of None payload=<built-in function len>>
+          collides with:
+            <plumb 'None' of None payload=<built-in function len>>
+    """
+    __slots__ = ('kind', '_stages')
+
+    def __init__(self, item, name=None, kind='generator'):
+        super(stream, self).__init__(item, name)
+        self.kind = kind
+
+    @classmethod
+    def filter(cls, func, name=None):
+        return cls(func, name, kind='filter')
+
+    @classmethod
+    def map(cls, func, name=None):
+        return cls(func, name, kind='map')
+
+    @property
+    def stages(self):
+        """Pairs of kind and function merged into this instruction, in order
+        """
+        return getattr(self, '_stages', None) or ((self.kind, self.payload),)
+
+    def __eq__(self, right):
+        """Streams are equal if their stages, kinds included, are
+
+            >>> stream.filter(len, 'a') == stream.map(len, 'a')
+            False
+            >>> stream.map(len, 'a') == stream.map(len, 'a')
             True
+        """
+        if self is right:
+            return True
+        return self.__class__ is right.__class__ \
+            and self.name == right.name and self.stages == right.stages
 
-            >>> foo + Instruction("bar")
-            Traceback (most recent call last):
-              ...
-            PlumbingCollision:
-                <_implements '__interfaces__' of None payload=('foo',)>
-              with:
-                <Instruction 'None' of None payload='bar'>
+    def __hash__(self):
+        try:
+            return hash((self.__class__, self.name, self.stages))
+        except TypeError:
+            return hash((self.__class__, self.name))
+
+    def __add__(self, right):
+        if self == right:
+            return self
+        if not isinstance(right, stream):
+            raise PlumbingCollision(self.name, self, right)
+        merged = stream(self.payload, name=self.name, kind=self.kind)
+        merged._stages = self.stages + right.stages
+        return merged
+
+    def __call__(self, cls):
+        endpoint = getattr(cls, self.name)
+        if not callable(endpoint):
+            raise PlumbingCollision(self.name, self, cls)
+        if getattr(endpoint, 'im_self', True) is None:
+            endpoint = endpoint.im_func
+        setattr(cls, self.name, streamfor(self.stages, endpoint))
+
+
+def single(nextmany, self, key):
+    """Call a batch pipeline for one key
+    """
+    return nextmany(self, [key])[0]
+
+
+def perkey(stage, nextone, self, keys):
+    """Call a per item stage for each of keys, as a stage of a batch pipeline
+    """
+    return [stage(nextone, self, key) for key in keys]
+
+
+class pending(object):
+    """Placeholder for the result of a key forwarded by ``forwardkeys``
+    """
+    __slots__ = ('index',)
+
+    def __init__(self, index):
+        self.index = index
+
+
+def forwardkeys(stage, nextmany, self, keys):
+    """Call a forwarding per item stage for each of keys, see ``forwards``
+
+    The keys the stage passes to ``_next`` are collected and passed to
+    nextmany in one batch.
+    """
+    forwarded = []
+
+    def collect(self, key):
+        forwarded.append(key)
+        return pending(len(forwarded) - 1)
+    results = [stage(collect, self, key) for key in keys]
+    values = nextmany(self, forwarded) if forwarded else []
+    return [values[x.index] if isinstance(x, pending) else x
+            for x in results]
+
+
+def batchfor(stages, endpoint, batchendpoint=None):
+    """A batch entrance ``(self, keys)`` for a pipeline of mixed stages
+
+    ``stages`` are pairs of kind and function in pipeline order. ``batch``
+    stages take ``(_next, self, keys)`` and return a list of results,
+    ``item`` stages are called per key. An item stage declared with
+    ``forwardingstage``, see ``forwards``, passes the keys it forwards to
+    the stages after it in one batch. Any other item stage passes them one
+    by one, the stages after it run once per key. ``batchendpoint`` defaults
+    to calling endpoint per key::
+
+        >>> calls = []
+        >>> def upper(_next, self, keys):
+        ...     calls.append(('upper', keys))
+        ...     return _next(self, [x.upper() for x in keys])
+        >>> @forwardingstage
+        ... def lower(_next, self, key):
+        ...     return _next(self, key.lower())
+        >>> def double(_next, self, key):
+        ...     return 2 * _next(self, key)
+        >>> def getmany(self, keys):
+        ...     calls.append(('getmany', keys))
+        ...     return [self[x] for x in keys]
+
+        >>> entrance = batchfor((('batch', upper), ('item', lower)),
+        ...                     dict.__getitem__, getmany)
+        >>> entrance({'a': 1, 'b': 2}, ['a', 'b'])
+        [1, 2]
+        >>> calls
+        [('upper', ['a', 'b']), ('getmany', ['a', 'b'])]
+
+        >>> del calls[:]
+        >>> entrance = batchfor((('item', double),), dict.__getitem__, getmany)
+        >>> entrance({'a': 1, 'b': 2}, ['a', 'b'])
+        [2, 4]
+        >>> calls
+        [('getmany', ['a']), ('getmany', ['b'])]
+    """
+    if batchendpoint is None:
+        def batchendpoint(self, keys):
+            return [endpoint(self, key) for key in keys]
+    nextmany = batchendpoint
+    for kind, func in reversed(stages):
+        if kind == 'batch':
+            nextmany = partial(func, nextmany)
+        elif forwards(func):
+            nextmany = partial(forwardkeys, func, nextmany)
+        else:
+            nextmany = partial(perkey, func, partial(single, nextmany))
+
+    def entrance(self, keys):
+        return nextmany(self, keys)
+    return entrance
+
+
+class batch(Stage2Instruction):
+    """Batch variant of a plumbed method, see ``batchof``
+    """
+    __slots__ = ('itemname', '_stages', '_owners')
+
+    def __init__(self, item, name=None, itemname=None):
+        super(batch, self).__init__(item, name)
+        self.itemname = itemname
+
+    @property
+    def stages(self):
+        """The batch variants merged into this instruction, in order
+        """
+        return getattr(self, '_stages', None) or (self.payload,)
+
+    @property
+    def owners(self):
+        """The parts declaring the batch variants, in order
+        """
+        return getattr(self, '_owners', None) or (self.__parent__,)
+
+    def __eq__(self, right):
+        if self is right:
+            return True
+        return self.__class__ is right.__class__ \
+            and self.name == right.name \
+            and self.itemname == right.itemname \
+            and self.stages == right.stages
+
+    def __hash__(self):
+        return hash((self.__class__, self.name, self.itemname, self.stages))
+
+    def __add__(self, right):
+        if self == right:
+            return self
+        if not isinstance(right, batch) or self.itemname != right.itemname:
+            raise PlumbingCollision(self.name, self, right)
+        merged = batch(self.payload, self.name, self.itemname)
+        merged._stages = self.stages + right.stages
+        merged._owners = self.owners + right.owners
+        return merged
+
+    def __call__(self, cls):
+        from plumber.attic import stacksof
+        endpoint = getattr(cls, self.itemname)
+        endpoint = getattr(endpoint, 'im_func', endpoint)
+        endpoint = getattr(endpoint, '__plumbing_endpoint__', endpoint)
+        batchendpoint = getattr(cls, self.name, None)
+        if batchendpoint is not None:
+            batchendpoint = getattr(batchendpoint, 'im_func', batchendpoint)
+        item = stacksof(cls)['stages']['stage2'].get(self.itemname)
+        item = item and item[-1]
+        if not isinstance(item, plumb):
+            raise PlumbingCollision(self.name, self, cls)
+        variants = dict(zip(self.owners, self.stages))
+        if not set(variants).issubset(item.owners):
+            # a batch variant needs a stage of the part to vary
+            raise PlumbingCollision(self.name, self, item)
+        enabled = item.enabled(cls, endpoint)[0]
+        stages = []
+        for stage, owner in zip(item.stages, item.owners):
+            condition = getattr(stage, '__plumbing_condition__', None)
+            if condition is not None and not met(condition, cls):
+                continue
+            if owner in variants:
+                stages.append(('batch', variants[owner]))
+            elif (stage, owner) in enabled:
+                stages.append(('item', stage))
+        entrance = batchfor(stages, endpoint, batchendpoint)
+        entrance.__name__ = self.name
+        setattr(cls, self.name, entrance)
+
+
+def batchof(itemname):
+    """Declare a plumbing method the batch variant of the method itemname
+
+    The part declaring it needs to plumb itemname. Parts plumbing itemname,
+    but providing no batch variant, are called per key in the batch
+    pipeline, see ``batchfor``: the stages after one not declared with
+    ``forwardingstage`` run once per key. Stages disabled or
+    elided from the pipeline of itemname are left out, their batch variants
+    are kept for pass-through ones. An endpoint defined by the plumbing class
+    is used, otherwise the endpoint of itemname is called per key::
+
+        >>> from plumber.attic import plumber
+        >>> from plumber._part import Part
+
+        >>> class Cache(Part):
+        ...     @plumb
+        ...     def __getitem__(_next, self, key):
+        ...         try:
+        ...             return self.cache[key]
+        ...         except KeyError:
+        ...             value = self.cache[key] = _next(self, key)
+        ...             return value
+        ...     @batchof('__getitem__')
+        ...     def getmany(_next, self, keys):
+        ...         missing = [x for x in keys if x not in self.cache]
+        ...         if missing:
+        ...             self.cache.update(zip(missing, _next(self, missing)))
+        ...         return [self.cache[x] for x in keys]
+
+        >>> class Lower(Part):
+        ...     @plumb
+        ...     @enabledif('lower')
+        ...     @forwardingstage
+        ...     def __getitem__(_next, self, key):
+        ...         return _next(self, key.lower())
+
+        >>> class Storage(dict):
+        ...     __metaclass__ = plumber
+        ...     __plumbing__ = Cache, Lower
+        ...     cache = {}
+        ...     lower = True
+        ...     def getmany(self, keys):
+        ...         print 'round trip', keys
+        ...         return [dict.__getitem__(self, x) for x in keys]
+
+        >>> storage = Storage(a=1, b=2)
+        >>> storage.getmany(['A', 'B'])
+        round trip ['a', 'b']
+        [1, 2]
+        >>> storage['A']
+        1
+
+    Disabled stages are left out of the batch pipeline as well::
+
+        >>> class Storage(dict):
+        ...     __metaclass__ = plumber
+        ...     __plumbing__ = Cache, Lower
+        ...     cache = {}
+        ...     lower = False
+        >>> storage = Storage(a=1, A=2)
+        >>> storage['A'], storage.getmany(['A'])
+        (2, [2])
+
+    A stage handling exceptions of ``_next`` is not forwarding, batch and
+    item access agree::
+
+        >>> class Fallback(Part):
+        ...     @plumb
+        ...     def __getitem__(_next, self, key):
+        ...         try:
+        ...             return _next(self, key)
+        ...         except KeyError:
+        ...             return _next(self, key.lower())
+
+        >>> class Storage(dict):
+        ...     __metaclass__ = plumber
+        ...     __plumbing__ = Cache, Fallback
+        ...     cache = {}
+        >>> storage = Storage(a=10)
+        >>> storage.getmany(['A'])
+        [10]
+        >>> storage.cache.clear()
+        >>> storage['A']
+        10
+    """
+    return lambda func: batch(func, itemname=itemname)
+
+
+class _implements(Stage2Instruction):
+    """classImplements interfaces
+
+        >>> foo = _implements(('foo',))
+        >>> foo == foo
+        True
+        >>> foo + foo is foo
+        True
+
+        >>> foo == _implements(('foo',))
+        True
+        >>> foo != _implements(('bar',))
+        True
+
+        >>> _implements(('foo', 'bar')) == _implements(('bar', 'foo'))
+        True
+
+        >>> foo + _implements(('foo',)) is foo
+        True
+
+        >>> bar = _implements(('bar',))
+        >>> foo + bar
+        <_implements '__interfaces__' of None payload=('bar', 'foo')>
+
+        >>> foo + bar == bar + foo
+        True
+
+        >>> foo + Instruction("bar")
+        Traceback (most recent call last):
+          ...
+        PlumbingCollision: '__interfaces__'
+            <_implements '__interfaces__' of None payload=('foo',)>
+          collides with:
+            <Instruction 'None' of None payload='bar'>
+    """
+    __slots__ = ('_cached',)
+
+    def __init__(self, item, name="__interfaces__"):
+        if type(item) is tuple:
+            item = tuple(sorted(set(item)))
+        super(_implements, self).__init__(item, name)
+
+    def __add__(self, right):
+        if self == right:
+            return self
+        if not isinstance(right, _implements):
+            raise PlumbingCollision(self.name, self, right)
+        ifaces = self.payload + right.payload
+        return _implements(ifaces)
+
+    def __call__(self, cls):
+        classimplements(cls, self.payload)
+
+    @property
+    def payload(self):
+        """The interfaces, sorted once per declaration of the part
         """
-        __name__ = "__interfaces__"
-
-        def __add__(self, right):
-            if self == right:
-                return self
-            if not isinstance(right, _implements):
-                raise PlumbingCollision(self, right)
-            ifaces = self.payload + right.payload
-            return _implements(ifaces)
-
-        def __call__(self, cls):
-            if self.payload:
-                classImplements(cls, *self.payload)
-
-        @property
-        def payload(self):
-            if type(self.item) is tuple:
-                return tuple(sorted(self.item))
-            return tuple(sorted(implementedBy(self.item)))
+        if type(self.item) is tuple:
+            return self.item
+        spec = getattr(self.item, '__implemented__', None)
+        if spec is None:
+            return ()
+        key = (spec, getattr(spec, '__bases__', None))
+        cached = getattr(self, '_cached', None)
+        if cached is None or cached[0] != key:
+            cached = self._cached = key, tuple(sorted(implementedby(self.item)))
+        return cached[1]
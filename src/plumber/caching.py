@@ -0,0 +1,264 @@
+"""Memoizing stages for plumb pipelines
+
+``cached`` creates a part memoizing a method, ``__getitem__`` by default. It
+is placed in ``__plumbing__`` like any other part, the stages before it are
+called for every access, the stages after it only on a miss::
+
+    >>> from plumber import caching
+    >>> from plumber.attic import plumber
+    >>> from plumber.attic_instr import plumb
+    >>> from plumber._part import Part
+
+    >>> class Lower(Part):
+    ...     @plumb
+    ...     def __getitem__(_next, self, key):
+    ...         return _next(self, key.lower())
+
+    >>> class Backend(Part):
+    ...     @plumb
+    ...     def __getitem__(_next, self, key):
+    ...         print 'load', key
+    ...         return _next(self, key)
+
+    >>> Cache = caching.cached(maxsize=2)
+    >>> class Storage(dict):
+    ...     __metaclass__ = plumber
+    ...     __plumbing__ = Lower, Cache, Backend
+
+    >>> storage = Storage(a=1, b=2, c=3)
+    >>> storage['A'], storage['a'], storage['B']
+    load a
+    load b
+    (1, 1, 2)
+
+The least recently used entry is evicted, once more than ``maxsize`` entries
+are cached, 128 by default, ``None`` for no bound. ``memofor`` returns the memo of an instance with the counters of
+hits, misses and evictions::
+
+    >>> storage['c']
+    load c
+    3
+    >>> storage['a']
+    load a
+    1
+    >>> memo = Cache.memofor(storage)
+    >>> len(memo), memo.hits, memo.misses, memo.evictions
+    (2, 1, 4, 2)
+
+Methods named in ``invalidate`` drop the entry of the call with their first
+argument as sole argument, by default ``__setitem__``, ``__delitem__``,
+``pop`` and ``setdefault``. Methods named in ``clearon`` drop all entries, by
+default ``clear``, ``update`` and ``popitem``. Other methods changing the
+values, e.g. of a base class, leave the memo stale::
+
+    >>> storage['a'] = 5
+    >>> storage['a']
+    load a
+    5
+    >>> storage.pop('a')
+    5
+    >>> storage.update(a=6)
+    >>> storage['a']
+    load a
+    6
+    >>> storage.clear()
+    >>> len(memo)
+    0
+
+Entries expire ``ttl`` seconds after they were stored. With ``sizeof``, the
+size of the memo is the sum of the sizes of the cached values, instead of
+their number::
+
+    >>> Cache = caching.cached(ttl=10, maxsize=5, sizeof=len)
+    >>> class Storage(dict):
+    ...     __metaclass__ = plumber
+    ...     __plumbing__ = Cache, Backend
+
+    >>> timer = caching.timer
+    >>> caching.timer = lambda: 100.
+    >>> storage = Storage(a='aaa', b='bb', c='cc')
+    >>> storage['a'], storage['b']
+    load a
+    load b
+    ('aaa', 'bb')
+    >>> storage['c'], storage['b']
+    load c
+    ('cc', 'bb')
+    >>> memo = Cache.memofor(storage)
+    >>> memo.size, memo.evictions
+    (4, 1)
+    >>> caching.timer = lambda: 110.
+    >>> storage['b']
+    load b
+    'bb'
+    >>> caching.timer = timer
+
+With ``scope='class'``, all instances of a plumbing class share one memo, for
+instances reading from a shared backend. Instance memos are stored in the
+instance's ``__dict__``. Unhashable keys and calls with keyword arguments are
+not cached.
+"""
+import itertools
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from plumber._part import Part
+from plumber.attic_instr import plumb
+from plumber.attic_instr import plumbifexists
+
+
+timer = time.time
+
+SCOPES = ('instance', 'class')
+
+_MISSING = object()
+
+_ids = itertools.count()
+
+
+class Memo(object):
+    """Cached values by key, least recently used first
+
+    ``maxsize`` bounds the number of entries, or the sum of their sizes if
+    ``sizeof`` is given, ``ttl`` is the lifetime of an entry in seconds.
+    """
+    __slots__ = ('maxsize', 'ttl', 'sizeof', 'entries', 'size', 'hits',
+                 'misses', 'evictions', 'lock')
+
+    def __init__(self, maxsize=None, ttl=None, sizeof=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.sizeof = sizeof
+        # key -> (value, expires, size)
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """The value cached for key or ``_MISSING``
+        """
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                return _MISSING
+            if entry[1] is not None and entry[1] <= timer():
+                self.size -= entry[2]
+                self.evictions += 1
+                self.misses += 1
+                return _MISSING
+            self.entries[key] = entry
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        size = self.sizeof(value) if self.sizeof is not None else 1
+        expires = timer() + self.ttl if self.ttl is not None else None
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= old[2]
+            self.entries[key] = (value, expires, size)
+            self.size += size
+            if self.maxsize is None:
+                return
+            while self.size > self.maxsize and self.entries:
+                old = self.entries.popitem(last=False)[1]
+                self.size -= old[2]
+                self.evictions += 1
+
+    def discard(self, key):
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= old[2]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+def keyof(args, kw):
+    """The memo key of a call, None if it is not cached
+
+    The key is the tuple of arguments, a tuple passed as sole argument does
+    not collide with the same values passed as arguments::
+
+        >>> keyof(('a', 'b'), None), keyof((('a', 'b'),), None)
+        (('a', 'b'), (('a', 'b'),))
+        >>> keyof(([],), None), keyof(('a',), {'default': 1})
+        (None, None)
+    """
+    if kw or not args:
+        return None
+    try:
+        hash(args)
+    except TypeError:
+        return None
+    return args
+
+
+def cached(name='__getitem__', maxsize=128, ttl=None, sizeof=None,
+           scope='instance',
+           invalidate=('__setitem__', '__delitem__', 'pop', 'setdefault'),
+           clearon=('clear', 'update', 'popitem')):
+    """A part memoizing the method name, see the module docstring
+    """
+    if scope not in SCOPES:
+        raise ValueError("scope must be one of %s, not %r" % (SCOPES, scope))
+    attrname = '__plumbing_memo_%i__' % next(_ids)
+    memos = weakref.WeakKeyDictionary()
+
+    if scope == 'instance':
+        def memofor(obj):
+            try:
+                return obj.__dict__[attrname]
+            except KeyError:
+                memo = obj.__dict__[attrname] = Memo(maxsize, ttl, sizeof)
+                return memo
+    else:
+        def memofor(obj):
+            cls = type(obj)
+            try:
+                return memos[cls]
+            except KeyError:
+                return memos.setdefault(cls, Memo(maxsize, ttl, sizeof))
+
+    def lookup(_next, self, *args, **kw):
+        key = keyof(args, kw)
+        if key is None:
+            return _next(self, *args, **kw)
+        memo = memofor(self)
+        value = memo.get(key)
+        if value is _MISSING:
+            value = _next(self, *args)
+            memo.set(key, value)
+        return value
+
+    def drop(_next, self, *args, **kw):
+        result = _next(self, *args, **kw)
+        key = keyof(args[:1], None)
+        if key is not None:
+            memofor(self).discard(key)
+        return result
+
+    def clear(_next, self, *args, **kw):
+        result = _next(self, *args, **kw)
+        memofor(self).clear()
+        return result
+
+    dct = {name: plumb(lookup), 'memofor': staticmethod(memofor)}
+    for x in invalidate:
+        dct[x] = plumbifexists(drop)
+    for x in clearon:
+        dct[x] = plumbifexists(clear)
+    return type(Part)('Cached', (Part,), dct)
@@ -1,14 +1,22 @@
+import itertools
+import threading
+import types
+import weakref
+
+from plumber import plancache
+from plumber import profiling
+from plumber._instructions import EitherOrInstruction
 from plumber._instructions import Instruction
+from plumber._instructions import adopt
 from plumber._instructions import finalize
 from plumber.exceptions import PlumbingCollision
 from plumber.tools import Bases
-
-try:
-    from zope.interface import classImplements
-    from zope.interface import implementedBy
-    ZOPE_INTERFACE_AVAILABLE = True
-except ImportError:                  #pragma NO COVERAGE
-    ZOPE_INTERFACE_AVAILABLE = False #pragma NO COVERAGE
+from plumber.tools import classimplements
+from plumber.tools import curry
+from plumber.tools import fingerprint
+from plumber.tools import implementedby
+from plumber.tools import mergeinterfaces
+from plumber.tools import unchanged
 
 
 # XXX: derive from list/UserList and store self on plumber
@@ -28,7 +36,11 @@ class Instructions(object):
 
     @property
     def instructions(self):
-        return getattr(self.plumber, self.attrname)
+        dct = self.plumber.__dict__
+        if self.attrname in dct:
+            return dct[self.attrname]
+        # lean plumbers keep their instructions in their plan only
+        return tuple(x[1] for x in dct[Plan.attrname].actions)
 
     def __getattr__(self, name):
         return getattr(self.instructions, name)
@@ -39,7 +51,8 @@ class Instructions(object):
 
     def __init__(self, plumber):
         self.plumber = plumber
-        if not plumber.__dict__.has_key(self.attrname):
+        if not plumber.__dict__.has_key(self.attrname) \
+                and not plumber.__dict__.has_key(Plan.attrname):
             setattr(plumber, self.attrname, [])
 
     def __repr__(self):
@@ -48,9 +61,659 @@ class Instructions(object):
             )
 
 
+class Plan(object):
+    """Resolution plan of a plumber, compiled once from its instructions
+
+    For each instruction the name, payload and check are looked up once,
+    applying the plan to a class dict is a loop over these actions. The
+    plumbing stacks of the dict are copied on write, the plumbed class' stacks
+    stay untouched::
+
+        >>> from plumber import default
+        >>> class P(object): pass
+        >>> instrs = Instructions(P)
+        >>> instrs.append(default(1, 'a'))
+        >>> instrs.append(finalize(2, 'b'))
+        >>> plan = Plan(P)
+        >>> plan.actions
+        (('a', <plumber._instructions.default object at 0x...>, 1, <bound ...>),
+         ('b', <plumber._instructions.finalize object at 0x...>, 2, <bound ...>))
+
+        >>> stacks = {'a': []}
+        >>> dct = dict(a=3, __plumbing_stacks__=stacks)
+        >>> plan(dct, dict())
+        >>> dct['a'], dct['b']
+        (3, 2)
+        >>> dct['__plumbing_stacks__'] is stacks, stacks
+        (False, {'a': []})
+
+    Collisions name the plumber and the class the dict belongs to::
+
+        >>> plan(dict(b=1), dict(), 'target')
+        Traceback (most recent call last):
+          ...
+        PlumbingCollision: 'b'
+            <class 'plumber.meta.P'>
+          collides with:
+            target
+    """
+    attrname = "__plumbing_plan__"
+
+    def __init__(self, plumber):
+        self.plumber = plumber
+        actions = []
+        for instr in Instructions(plumber):
+            if isinstance(instr, EitherOrInstruction):
+                check = instr.check
+            else:
+                check = None
+            actions.append((instr.name, instr, instr.payload, check))
+        self.actions = tuple(actions)
+
+    def __call__(self, dct, bases, target=None, steps=None):
+        """Apply the plan to dct, target is the class the dict belongs to
+
+        The outcome of each action is appended to ``steps``, if given, to be
+        replayed by ``replay``.
+        """
+        stacks = dict(dct.get('__plumbing_stacks__', ()))
+        dct['__plumbing_stacks__'] = stacks
+        if profiling.stats is None:
+            self.apply(self.actions, stacks, dct, bases, target, steps)
+            return
+        for action in self.actions:
+            with profiling.measure('stage1', self.plumber, action[0]):
+                self.apply((action,), stacks, dct, bases, target, steps)
+
+    def apply(self, actions, stacks, dct, bases, target, steps=None):
+        name = None
+        try:
+            for name, instr, payload, check in actions:
+                stack = stacks.get(name, [])
+                if check is None:
+                    stack = list(stack)
+                    if instr.apply(dct, bases, stack):
+                        stack.append(instr)
+                        stacks[name] = stack
+                        step = 'x'
+                    else:
+                        step = 'y'
+                elif stack and stack[-1] == instr:
+                    step = '0'
+                elif check(dct, bases, stack):
+                    dct[name] = payload
+                    stacks[name] = stack + [instr]
+                    step = '2'
+                else:
+                    stacks[name] = stack + [instr]
+                    step = '1'
+                if steps is not None:
+                    steps.append(step)
+        except PlumbingCollision:
+            # provide more information than the instruction could
+            raise PlumbingCollision(name, self.plumber, target)
+
+    def replay(self, dct, bases, target, steps):
+        """Apply the plan to dct with the outcome of each action given
+
+        ``steps`` has one character per action: ``0`` nothing to do, ``1``
+        stack the instruction, ``2`` stack it and set its payload. ``x`` and
+        ``y`` instructions (stacked or not) are applied as usual::
+
+            >>> from plumber import default
+            >>> class P(object): pass
+            >>> instrs = Instructions(P)
+            >>> instrs.append(default(1, 'a'))
+            >>> instrs.append(default(2, 'b'))
+            >>> plan = Plan(P)
+            >>> steps = []
+            >>> dct = dict(a=0)
+            >>> plan(dct, dict(), steps=steps)
+            >>> steps
+            ['1', '2']
+
+            >>> replayed = dict(a=0)
+            >>> plan.replay(replayed, dict(), None, ''.join(steps))
+            >>> replayed == dct
+            True
+        """
+        stacks = dict(dct.get('__plumbing_stacks__', ()))
+        dct['__plumbing_stacks__'] = stacks
+        for action, step in zip(self.actions, steps):
+            if step in 'xy':
+                self.apply((action,), stacks, dct, bases, target)
+            elif step != '0':
+                name, instr, payload, check = action
+                stacks[name] = stacks.get(name, []) + [instr]
+                if step == '2':
+                    dct[name] = payload
+
+
+class PlumbingCache(object):
+    """Plumbing classes created by plumbers, per plumbed class
+
+    Applying the same plumber with the same curry arguments to the same class
+    again returns the plumbing class created the first time::
+
+        >>> from plumber import Plumber
+        >>> class P(Plumber):
+        ...     a = 1
+        >>> class A(object):
+        ...     pass
+        >>> P(A) is P(A)
+        True
+
+    The cache does not keep plumbed classes alive::
+
+        >>> ref = weakref.ref(A)
+        >>> del A
+        >>> import gc; _ = gc.collect()
+        >>> ref() is None
+        True
+
+    Plumbed classes are referenced weakly, for each of them the ``maxsize``
+    most recently used plumbings are kept::
+
+        >>> class A(object):
+        ...     pass
+        >>> cache = PlumbingCache(maxsize=2)
+        >>> cache.set(A, 1, 'one')
+        'one'
+        >>> cache.set(A, 2, 'two')
+        'two'
+        >>> cache.get(A, 1)
+        'one'
+        >>> cache.set(A, 3, 'three')
+        'three'
+        >>> cache.get(A, 2) is None
+        True
+        >>> cache.get(A, 1)
+        'one'
+
+    Of plumbings created concurrently for the same key the first one set is
+    kept and returned to all threads::
+
+        >>> cache.set(A, 3, 'another three')
+        'three'
+
+        >>> del A
+        >>> _ = gc.collect()
+        >>> len(cache)
+        0
+
+    Plumbings cached for a class are dropped once the class changed, see
+    ``tools.fingerprint``::
+
+        >>> class A(object):
+        ...     pass
+        >>> cache.set(A, 1, 'one')
+        'one'
+        >>> A.a = 1
+        >>> cache.get(A, 1) is None
+        True
+        >>> cache.set(A, 1, 'new one')
+        'new one'
+
+    ``clear`` empties the cache.
+    """
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.clock = itertools.count()
+        self.clear()
+
+    def clear(self):
+        self.plumbings = weakref.WeakKeyDictionary()
+
+    def get(self, cls, key):
+        """Lock-free, a hit only stamps the entry as recently used
+        """
+        plumbings = self.plumbings.get(cls)
+        if plumbings is None or not unchanged(cls, plumbings[0]):
+            return None
+        entry = plumbings[1].get(key)
+        if entry is None:
+            return None
+        entry[1] = next(self.clock)
+        return entry[0]
+
+    def set(self, cls, key, plumbing):
+        """Publish plumbing and return it, or the plumbing another thread
+        published first
+        """
+        with self.lock:
+            plumbings = self.plumbings.get(cls)
+            if plumbings is None or not unchanged(cls, plumbings[0]):
+                plumbings = self.plumbings[cls] = (fingerprint(cls), {})
+            plumbings = plumbings[1]
+            entry = plumbings.get(key)
+            if entry is None:
+                entry = plumbings[key] = [plumbing, next(self.clock)]
+                if len(plumbings) > self.maxsize:
+                    del plumbings[min(plumbings,
+                                      key=lambda x: plumbings[x][1])]
+            else:
+                entry[1] = next(self.clock)
+            return entry[0]
+
+    def __len__(self):
+        return len(self.plumbings)
+
+
+cache = PlumbingCache()
+
+
+class DerivedCache(object):
+    """Classes derived from plumbed classes for instances, see
+    ``plumbinstance``
+
+    A derived class references the class it is derived from, it is held
+    weakly and lives as long as instances of it do::
+
+        >>> class A(object):
+        ...     pass
+        >>> derived = DerivedCache()
+        >>> B = type('B', (A,), {})
+        >>> derived.set(A, 'key', B) is B
+        True
+        >>> derived.get(A, 'key') is B
+        True
+
+        >>> import gc
+        >>> ref = weakref.ref(A)
+        >>> del A, B; _ = gc.collect()
+        >>> ref() is None, len(derived)
+        (True, 0)
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        # (weakref to class, key) -> (weakref to derived class, fingerprint)
+        self.derived = {}
+
+    def get(self, cls, key):
+        entry = self.derived.get((weakref.ref(cls), key))
+        if entry is None:
+            return None
+        derived = entry[0]()
+        if derived is None or not unchanged(cls, entry[1]):
+            return None
+        return derived
+
+    def set(self, cls, key, derived):
+        """Publish derived and return it, or the class another thread
+        published first
+        """
+        with self.lock:
+            current = self.get(cls, key)
+            if current is not None:
+                return current
+            k = (weakref.ref(cls), key)
+            derivedmap = self.derived
+
+            def drop(ref):
+                entry = derivedmap.get(k)
+                if entry is not None and entry[0] is ref:
+                    del derivedmap[k]
+            self.derived[k] = (weakref.ref(derived, drop), fingerprint(cls))
+            return derived
+
+    def __len__(self):
+        return len(self.derived)
+
+
+derivedcache = DerivedCache()
+
+
+def interfacesof(plumbers):
+    """Interfaces implemented by plumbers, each listed once
+    """
+    return mergeinterfaces(*[implementedby(x) for x in plumbers])
+
+
+def resolve(plumbers, dct, x, interfaces=None, steps=None):
+    """Apply the plans of plumbers to dct, the dict of class x
+
+    Returns the interfaces to declare, by default the ones implemented by the
+    plumbers. With the plan cache enabled, a resolution stored for the same
+    sources is replayed, see ``plancache``. The outcome of the actions of each
+    plan is appended to ``steps``, if given.
+    """
+    plans = [plumber.__dict__[Plan.attrname] for plumber in reversed(plumbers)]
+    bases = Bases(x)
+    store = plancache.store
+    if store is None and steps is None:
+        for plan in plans:
+            plan(dct, bases, x)
+        if interfaces is None:
+            interfaces = interfacesof(plumbers)
+        return interfaces
+
+    if steps is None:
+        steps = []
+    resolution = store and store.get(plumbers, x)
+    if resolution:
+        stored, cached = resolution
+        stored = stepsof(plans, stored)
+        if stored is not None:
+            for plan, s in zip(plans, stored):
+                plan.replay(dct, bases, x, s)
+            steps.extend(stored)
+            return cached if interfaces is None else interfaces
+    planned = []
+    for plan in plans:
+        actions = []
+        plan(dct, bases, x, actions)
+        planned.append(''.join(actions))
+    steps.extend(planned)
+    if interfaces is None:
+        interfaces = interfacesof(plumbers)
+    if store is not None:
+        named = [[[a[0], step] for a, step in zip(plan.actions, s)]
+                 for plan, s in zip(plans, planned)]
+        store.set(plumbers, x, named, interfacesof(plumbers))
+    return interfaces
+
+
+def stepsof(plans, named):
+    """The steps of plans from stored pairs of name and step per action
+
+    None if the names do not match the actions of the plans, the order of
+    the actions differs between processes::
+
+        >>> from plumber import default
+        >>> class P(object): pass
+        >>> instrs = Instructions(P)
+        >>> instrs.append(default(1, 'a'))
+        >>> instrs.append(default(2, 'b'))
+        >>> plan = Plan(P)
+        >>> names = [x[0] for x in plan.actions]
+        >>> stepsof([plan], [zip(names, '12')])
+        ['12']
+        >>> stepsof([plan], [zip(reversed(names), '12')]) is None
+        True
+    """
+    if len(named) != len(plans):
+        return None
+    result = []
+    for plan, pairs in zip(plans, named):
+        if [x[0] for x in plan.actions] != [x[0] for x in pairs]:
+            return None
+        result.append(''.join(str(x[1]) for x in pairs))
+    return result
+
+
+class Summary(object):
+    """What a lean plumbing class keeps of its plumbing stacks
+
+    Plumbers with ``__plumbing_lean__`` set, or all plumbers if it is set on
+    ``PlumberMeta``, create lean plumbing classes. Instead of the stacks these
+    keep the plumbers, the outcome of their actions as recorded for
+    ``Plan.replay`` and the stacks of the plumbed class. ``stacksof``
+    rebuilds the stacks on demand::
+
+        >>> from plumber import Plumber
+        >>> from plumber import default
+        >>> class f(Plumber):
+        ...     __plumbing_lean__ = True
+        ...     a = default(1)
+        >>> class A(object):
+        ...     pass
+        >>> F = f(A)
+        >>> '__plumbing_stacks__' in F.__dict__
+        False
+        >>> F.__plumbing_summary__.steps
+        ('2',)
+        >>> stacksof(F)
+        {'a': [<plumber._instructions.default object at 0x...>]}
+
+    Lean plumbers keep their instructions in their plan only::
+
+        >>> '__plumbing_instructions__' in f.__dict__
+        False
+        >>> Instructions(f)
+        [('a', <class 'plumber._instructions.default'>, 1)]
+
+    Lean plumbing classes can be plumbed again::
+
+        >>> class g(Plumber):
+        ...     a = default(2)
+        ...     b = default(3)
+        >>> G = g(F)
+        >>> G.a, G.b
+        (1, 3)
+        >>> sorted((k, len(v)) for k, v in stacksof(G).items())
+        [('a', 2), ('b', 1)]
+    """
+    __slots__ = ('plumbers', 'steps', 'base')
+    attrname = '__plumbing_summary__'
+
+    def __init__(self, plumbers, steps, base):
+        self.plumbers = plumbers
+        self.steps = steps
+        self.base = base
+
+    def stacks(self):
+        if isinstance(self.base, Summary):
+            stacks = self.base.stacks()
+        else:
+            stacks = dict(self.base or ())
+        for plumber, steps in zip(reversed(self.plumbers), self.steps):
+            actions = plumber.__dict__[Plan.attrname].actions
+            for (name, instr, payload, check), step in zip(actions, steps):
+                if step in '12x':
+                    stacks[name] = stacks.get(name, []) + [instr]
+        return stacks
+
+
+def stacksof(cls):
+    """The plumbing stacks of a plumbing class, rebuilt for lean ones
+    """
+    dct = cls.__dict__
+    if '__plumbing_stacks__' in dct:
+        return dct['__plumbing_stacks__']
+    summary = dct.get(Summary.attrname)
+    if summary is None:
+        return {}
+    return summary.stacks()
+
+
+def plumbclass(plumbers, x, cargs=(), defkw={}, interfaces=None):
+    """Create a plumbing class from class x and a chain of plumbers
+
+    The plumbers are applied right to left with the result of nested calls
+    ``f(g(x))``, but in one pass without intermediate classes. ``cargs`` and
+    ``defkw`` are used for currying of ``__init__``. ``interfaces`` default
+    to the ones implemented by the plumbers::
+
+        >>> from plumber import Plumber
+        >>> class f(Plumber):
+        ...     a = 1
+        >>> class g(Plumber):
+        ...     b = 2
+        >>> class A(object):
+        ...     pass
+        >>> F = plumbclass((f, g), A)
+        >>> F, F.a, F.b
+        (<class 'plumber.meta.f_g_A'>, 1, 2)
+        >>> plumbclass((f, g), A) is F
+        True
+
+    Plumbings with curried arguments are not cached, equal arguments may
+    differ, e.g. ``1`` and ``True``::
+
+        >>> class B(object):
+        ...     def __init__(self, x):
+        ...         self.x = x
+        >>> plumbclass((f,), B, (1,)) is plumbclass((f,), B, (1,))
+        False
+        >>> plumbclass((f,), B, (True,))().x
+        True
+    """
+    key = None
+    if not (cargs or defkw):
+        key = plumbers
+        plumbing = cache.get(x, key)
+        if plumbing is not None:
+            return plumbing
+    dct, interfaces = plumbdict(plumbers, x, interfaces)
+
+    # check whether to curry something, an inherited __init__ is curried too
+    if cargs or defkw:
+        init = dct.get("__init__") or x.__init__
+        dct["__init__"] = curry(getattr(init, 'im_func', init), cargs, defkw)
+
+    name = "_".join([plumber.__name__ for plumber in plumbers] + [x.__name__])
+    plumbing = type(x)(name, x.__bases__, dct)
+    declare(plumbing, interfaces)
+    if key is not None:
+        plumbing = cache.set(x, key, plumbing)
+    return plumbing
+
+
+def plumbdict(plumbers, x, interfaces=None):
+    """The dict of class x with plumbers applied and the interfaces to declare
+    """
+    dct = x.__dict__.copy()
+    # type creates these for the new class, the ones of x would keep x alive
+    # and do not apply to instances of the new class
+    dct.pop('__dict__', None)
+    dct.pop('__weakref__', None)
+
+    summary = dct.pop(Summary.attrname, None)
+    if summary is not None:
+        # x is a lean plumbing class, resolution needs its stacks
+        dct['__plumbing_stacks__'] = summary.stacks()
+    lean = any(plumber.__plumbing_lean__ for plumber in plumbers)
+    if lean:
+        base = summary or dct.get('__plumbing_stacks__')
+        steps = []
+        interfaces = resolve(plumbers, dct, x, interfaces, steps)
+        del dct['__plumbing_stacks__']
+        dct[Summary.attrname] = Summary(plumbers, tuple(steps), base)
+    else:
+        interfaces = resolve(plumbers, dct, x, interfaces)
+    return dct, interfaces
+
+
+def declare(plumbing, interfaces):
+    """Declare the interfaces implemented by a plumbing class
+    """
+    if profiling.stats is None:
+        classimplements(plumbing, interfaces)
+    else:
+        with profiling.measure('interfaces', plumbing):
+            classimplements(plumbing, interfaces)
+
+
+def plumbinstance(plumbers, obj, cargs=(), defkw={}):
+    """Apply a chain of plumbers to instance obj
+
+    The class of obj is swapped for a class derived from it, which has the
+    plumbers applied. Derived classes are cached like plumbing classes, all
+    instances of a class plumbed the same way share one::
+
+        >>> from plumber import Plumber
+        >>> from plumber import default
+        >>> class f(Plumber):
+        ...     a = default(1)
+        ...     b = 2
+        >>> class A(object):
+        ...     a = 0
+        >>> a1, a2 = A(), A()
+        >>> plumbinstance((f,), a1) is a1
+        True
+        >>> type(a1), a1.a, a1.b
+        (<class 'plumber.meta.f_A'>, 0, 2)
+        >>> type(plumbinstance((f,), a2)) is type(a1)
+        True
+        >>> isinstance(a1, A), type(A()) is A
+        (True, True)
+
+    The derived class declares no slots, instances keep their layout::
+
+        >>> class B(object):
+        ...     __slots__ = ('x',)
+        >>> b = plumbinstance((f,), B())
+        >>> b.b, hasattr(b, '__dict__')
+        (2, False)
+
+    Derived classes do not keep the classes of instances alive::
+
+        >>> import gc
+        >>> ref = weakref.ref(A)
+        >>> del A, a1, a2; _ = gc.collect()
+        >>> ref() is None
+        True
+
+    ``cargs`` and ``defkw`` are curried into ``__call__``, such derived
+    classes are not cached::
+
+        >>> class C(object):
+        ...     def __call__(self, x, y=1):
+        ...         return x, y
+        >>> plumbinstance((f,), C(), (3,), dict(y=4))()
+        (3, 4)
+    """
+    cls = obj.__class__
+    key = derived = None
+    if not (cargs or defkw):
+        key = plumbers
+        derived = derivedcache.get(cls, key)
+    if derived is None:
+        dct, interfaces = plumbdict(plumbers, cls)
+        # the derived class needs only what the plumbers changed
+        own = cls.__dict__
+        dct = dict((k, v) for k, v in dct.iteritems()
+                   if k not in own or own[k] is not v)
+        dct['__slots__'] = ()
+        dct['__module__'] = cls.__module__
+        dct.setdefault('__doc__', own.get('__doc__'))
+        if cargs or defkw:
+            call = dct.get('__call__') or getattr(cls, '__call__', None)
+            if call is not None:
+                call = getattr(call, 'im_func', call)
+                dct['__call__'] = curry(call, cargs, defkw)
+        name = "_".join([x.__name__ for x in plumbers] + [cls.__name__])
+        derived = type(cls)(name, (cls,), dct)
+        declare(derived, interfaces)
+        if key is not None:
+            derived = derivedcache.set(cls, key, derived)
+    obj.__class__ = derived
+    return obj
+
+
+def gather(plumber):
+    """Generate the instructions and the plan of a plumber
+
+    Both are built completely before they are set on the plumber, the
+    instructions as a tuple.
+    """
+    instructions = []
+    for name, item in plumber.__dict__.iteritems():
+        # ignored attributes
+        if name.startswith('__plumb'): continue
+        if name in ['__doc__', '__module__']: continue
+
+        # XXX: rethink this
+        # undecorated items are understood as finalize
+        if not isinstance(item, Instruction):
+            item = finalize(item)
+        instructions.append(adopt(item, name, plumber))
+
+    setattr(plumber, Instructions.attrname, tuple(instructions))
+    setattr(plumber, Plan.attrname, Plan(plumber))
+    if plumber.__plumbing_lean__:
+        delattr(plumber, Instructions.attrname)
+
+
 class PlumberMeta(type):
     """meta class for plumbers
     """
+    __plumbing_lean__ = False
+
     def __call__(plumber, x, *cargs, **defkw):
         """Do a plumbers work
 
@@ -63,41 +726,14 @@ class PlumberMeta(type):
         Create a new class with the same bases and apply the plumber to it.
 
         If x is an instance:
-        Apply plumber to it - XXX! adapt
+        Swap its class for a class derived from it, with the plumber applied,
+        see ``plumbinstance``.
         """
-        # instances of normal classes are modified in place
-        # for classes, new classes are created
-        x_is_class = issubclass(type(x), type)
-        if x_is_class:
-            dct = x.__dict__.copy()
-            fntocurry = "__init__"
-        else:
-            raise
-            dct = x.__dict__
-            fntocurry = "__call__"
-
-        bases = Bases(x)
-        for instr in Instructions(plumber):
-            try:
-                instr(dct, bases)
-            except PlumbingCollision:
-                # provide more information than instr could
-                raise PlumbingCollision(instr.name, plumber, x)
-
-            # in case of instances functions need to be bound
-            # if not x_is_class and (type(instr) is types.FunctionType):
-            #     instr = instr.__get__(x)
-
-        # check whether to curry something
-        if (cargs or defkw) and fntocurry in dct:
-            dct[fntocurry] = curry(dct[fntocurry], cargs, defkw)
-
-        if x_is_class:
-            name = "%s_%s" % (plumber.__name__, x.__name__)
-            x = type(x)(name, x.__bases__, dct)
-            if ZOPE_INTERFACE_AVAILABLE:
-                classImplements(x, *tuple(implementedBy(plumber)))
-        return x
+        # for classes, new classes are created, instances get a derived
+        # class
+        if isinstance(x, (type, types.ClassType)):
+            return plumbclass((plumber,), x, cargs, defkw)
+        return plumbinstance((plumber,), x, cargs, defkw)
 
     def __init__(plumber, name, bases, dct):
         """Will be called when a plumber class is created
@@ -115,22 +751,12 @@ class PlumberMeta(type):
          ('b', <class 'plumber._instructions.finalize'>, 2)]
         """
         super(PlumberMeta, plumber).__init__(name, bases, dct)
+        if profiling.stats is None:
+            gather(plumber)
+        else:
+            with profiling.measure('instructions', plumber):
+                gather(plumber)
 
-        # Get the plumber's instructions list
-        instructions = Instructions(plumber)
-
-        for name, item in plumber.__dict__.iteritems():
-            # ignored attributes
-            if name.startswith('__plumb'): continue
-            if name in ['__doc__', '__module__']: continue
-
-            # XXX: rethink this
-            # undecorated items are understood as finalize
-            if not isinstance(item, Instruction):
-                item = finalize(item)
-            item.__name__ = name
-            item.__parent__ = plumber
-            instructions.append(item)
 
         # # An existing docstring is an implicit plumb instruction for __doc__
         # if plumber.__doc__ is not None:
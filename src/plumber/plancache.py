@@ -0,0 +1,248 @@
+"""On-disk cache of resolved plumbings
+
+Resolving a chain of plumbers for a class checks each instruction against
+the class and its bases. With the plan cache enabled, the outcome of these
+checks and the interfaces to declare are stored per plumbers and class in a
+file and replayed on the next start, checks and collision detection are
+skipped::
+
+    >>> import os, shutil, sys, tempfile
+    >>> from plumber import plancache
+    >>> from plumber.meta import cache
+
+    >>> tmp = tempfile.mkdtemp()
+    >>> with open(os.path.join(tmp, 'plancached.py'), 'w') as f:
+    ...     f.write('''
+    ... from plumber import Plumber
+    ... from plumber import default
+    ... class P(Plumber):
+    ...     a = default(1)
+    ...     b = default(2)
+    ... class A(object):
+    ...     a = 0
+    ... ''')
+    >>> sys.path.insert(0, tmp)
+    >>> from plancached import A, P
+
+    >>> filename = os.path.join(tmp, 'plans.json')
+    >>> store = plancache.enable(filename)
+    >>> P(A).a, P(A).b
+    (0, 2)
+    >>> steps = store.entries['plancached.P|plancached.A']['steps']
+    >>> sorted(steps[0])
+    [['a', '1'], ['b', '2']]
+    >>> store.save()
+
+A new process loads the stored resolutions::
+
+    >>> store = plancache.enable(filename)
+    >>> cache.clear()
+    >>> B = P(A)
+    >>> B.a, B.b, store.hits
+    (0, 2, 1)
+
+Entries are keyed on the dotted names of the plumbers and the class, the
+steps are stored with the names of the attributes they are for. Entries are
+stale and rebuilt, if the source file of a module defining one of the
+plumbers, the class or its bases changed, or the names defined by the class
+or one of its bases are different::
+
+    >>> store.entries.values()[0]['sources'] = {'plancached': 'changed'}
+    >>> cache.clear()
+    >>> B = P(A)
+    >>> store.hits, store.misses
+    (1, 1)
+
+Classes defined outside of module files and classes not found under their
+dotted name, e.g. created by a factory, are not cached::
+
+    >>> def make():
+    ...     class A(object):
+    ...         pass
+    ...     return A
+    >>> B = P(make())
+    >>> store.hits, store.misses, len(store.entries)
+    (1, 2, 1)
+
+    >>> plancache.disable() is store
+    True
+    >>> sys.path.remove(tmp)
+    >>> del sys.modules['plancached']
+    >>> shutil.rmtree(tmp)
+
+``enable(filename, atexit=True)`` saves the resolutions at interpreter exit,
+so does setting the environment variable ``PLUMBER_PLAN_CACHE`` to a file
+name.
+"""
+import atexit as _atexit
+import hashlib
+import json
+import os
+import sys
+
+from plumber.tools import mro
+
+
+store = None
+
+_hashes = {}
+
+
+def sourcehash(module):
+    """sha1 of the source file of a module, None if there is none
+
+    Hashes are computed once per process.
+    """
+    filename = getattr(module, '__file__', None)
+    if filename is None:
+        return None
+    if filename[-4:] in ('.pyc', '.pyo'):
+        filename = filename[:-1]
+    try:
+        return _hashes[filename]
+    except KeyError:
+        pass
+    try:
+        with open(filename, 'rb') as f:
+            digest = hashlib.sha1(f.read()).hexdigest()
+    except IOError:
+        digest = None
+    _hashes[filename] = digest
+    return digest
+
+
+def dottedname(obj):
+    return '%s.%s' % (obj.__module__, obj.__name__)
+
+
+def resolvename(dottedname):
+    """The object of an imported module named by dottedname, or None
+    """
+    modname, _, name = dottedname.rpartition('.')
+    module = sys.modules.get(modname)
+    return getattr(module, name, None)
+
+
+def resolvable(*objs):
+    """Whether objs are found under their dotted names
+    """
+    for obj in objs:
+        if resolvename(dottedname(obj)) is not obj:
+            return False
+    return True
+
+
+def namesof(x):
+    """Dotted name and sorted names defined per class in the mro of x
+    """
+    return [[dottedname(cls), sorted(cls.__dict__)] for cls in mro(x)
+            if cls.__module__ != '__builtin__']
+
+
+class PlanStore(object):
+    """Resolutions of plumbings, loaded from and saved to filename
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.entries = {}
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        if os.path.exists(filename):
+            try:
+                with open(filename) as f:
+                    self.entries = json.load(f)
+            except ValueError:
+                # a broken file is rebuilt
+                self.entries = {}
+
+    def key(self, plumbers, x):
+        return '%s|%s' % (','.join(dottedname(p) for p in plumbers),
+                          dottedname(x))
+
+    def sources(self, plumbers, x):
+        """Hashes of the modules defining plumbers, x and its bases
+
+        None if one of them is not defined in a file.
+        """
+        result = {}
+        for cls in plumbers + mro(x):
+            module = sys.modules.get(cls.__module__)
+            if module is None:
+                return None
+            if module.__name__ == '__builtin__':
+                continue
+            digest = sourcehash(module)
+            if digest is None:
+                return None
+            result[module.__name__] = digest
+        return result
+
+    def get(self, plumbers, x):
+        """steps and interfaces stored for plumbers applied to x, or None
+        """
+        if not resolvable(x, *plumbers):
+            self.misses += 1
+            return None
+        entry = self.entries.get(self.key(plumbers, x))
+        if entry is None \
+                or entry['names'] != namesof(x) \
+                or entry['sources'] != self.sources(plumbers, x):
+            self.misses += 1
+            return None
+        interfaces = [resolvename(name) for name in entry['interfaces']]
+        if None in interfaces:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry['steps'], tuple(interfaces)
+
+    def set(self, plumbers, x, steps, interfaces):
+        """Store steps, pairs of name and step per action of each plan
+        """
+        if not resolvable(x, *plumbers):
+            return
+        sources = self.sources(plumbers, x)
+        if sources is None:
+            return
+        for iface in interfaces:
+            if resolvename(dottedname(iface)) is not iface:
+                return
+        self.entries[self.key(plumbers, x)] = dict(
+            sources=sources,
+            names=namesof(x),
+            steps=steps,
+            interfaces=[dottedname(x) for x in interfaces],
+            )
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp = self.filename + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.entries, f)
+        os.rename(tmp, self.filename)
+        self.dirty = False
+
+
+def enable(filename, atexit=False):
+    """Use the resolutions stored in filename and return the store
+    """
+    global store
+    store = PlanStore(filename)
+    if atexit:
+        _atexit.register(store.save)
+    return store
+
+
+def disable():
+    """Stop using stored resolutions and return the store
+    """
+    global store
+    result, store = store, None
+    return result
+
+
+if os.environ.get('PLUMBER_PLAN_CACHE'):
+    enable(os.environ['PLUMBER_PLAN_CACHE'], atexit=True) #pragma NO COVERAGE
@@ -0,0 +1,166 @@
+"""Opt-in profiling of plumbing class creation
+
+Profiling is disabled by default, class creation then only checks whether
+``stats`` is None::
+
+    >>> from plumber import Plumber
+    >>> from plumber import profiling
+    >>> profiling.stats is None
+    True
+
+While enabled, time and net number of gc tracked objects are recorded per
+phase, owner and attribute. Phases are ``instructions`` (gathering the
+instructions of a plumber or part), ``stage1``, ``stage2`` and
+``interfaces`` (declaration of zope interfaces)::
+
+    >>> stats = profiling.enable()
+    >>> class P(Plumber):
+    ...     a = 1
+    ...     b = 2
+    >>> class A(object):
+    ...     pass
+    >>> B = P(A)
+    >>> stats is profiling.disable()
+    True
+
+    >>> sorted(stats.records)
+    [('instructions', 'plumber.profiling.P', None),
+     ('interfaces', 'plumber.profiling.P_A', None),
+     ('stage1', 'plumber.profiling.P', 'a'),
+     ('stage1', 'plumber.profiling.P', 'b')]
+    >>> calls, seconds, objects = stats.records['stage1', 'plumber.profiling.P', 'a']
+    >>> calls
+    1
+
+``aggregate`` sums the records by some of phase, owner and name::
+
+    >>> sorted(stats.aggregate('phase'))
+    [('instructions',), ('interfaces',), ('stage1',)]
+    >>> stats.aggregate('phase', 'owner')['stage1', 'plumber.profiling.P'][0]
+    2
+
+``dump`` prints the aggregated records, most expensive first::
+
+    >>> stats.dump('owner')
+    calls      msecs    objects  owner
+    ...3 ...plumber.profiling.P...
+
+``enable(atexit=True)`` dumps the stats to stderr at interpreter exit, the
+environment variable ``PLUMBER_PROFILE=1`` does so from import time on.
+"""
+import atexit as _atexit
+import gc
+import os
+import sys
+import time
+
+
+stats = None
+
+FIELDS = ('phase', 'owner', 'name')
+
+
+def ownername(owner):
+    """Dotted name of a class, other owners are converted to str
+    """
+    try:
+        return '%s.%s' % (owner.__module__, owner.__name__)
+    except AttributeError:
+        return str(owner)
+
+
+class Stats(object):
+    """Records of calls, seconds and objects per (phase, owner, name)
+
+    Owners are stored by name, profiling does not keep classes alive.
+    """
+    def __init__(self, allocations=True):
+        self.allocations = allocations
+        self.records = {}
+
+    def add(self, key, seconds, objects):
+        record = self.records.get(key)
+        if record is None:
+            record = self.records[key] = [0, 0., 0]
+        record[0] += 1
+        record[1] += seconds
+        record[2] += objects
+
+    def aggregate(self, *fields):
+        """Sum the records by fields, all of them by default
+        """
+        fields = fields or FIELDS
+        indices = [FIELDS.index(x) for x in fields]
+        result = {}
+        for key, record in self.records.iteritems():
+            key = tuple(key[i] for i in indices)
+            total = result.setdefault(key, [0, 0., 0])
+            for i, value in enumerate(record):
+                total[i] += value
+        return result
+
+    def dump(self, *fields, **kw):
+        """Print the records aggregated by fields, most expensive first
+
+        ``stream`` defaults to stdout, ``limit`` restricts the number of lines.
+        """
+        stream = kw.get('stream') or sys.stdout
+        limit = kw.get('limit')
+        fields = fields or FIELDS
+        records = sorted(self.aggregate(*fields).iteritems(),
+                         key=lambda x: x[1][1], reverse=True)
+        print >> stream, "calls      msecs    objects  %s" % '  '.join(fields)
+        for key, (calls, seconds, objects) in records[:limit]:
+            print >> stream, "%5i %10.3f %10i  %s" % (
+                calls, seconds * 1000, objects,
+                '  '.join(str(x) for x in key))
+
+    def clear(self):
+        self.records.clear()
+
+
+class measure(object):
+    """Record the time and objects spent in a with block to ``stats``
+
+    Only used while profiling is enabled.
+    """
+    __slots__ = ('stats', 'key', 'start', 'objects')
+
+    def __init__(self, phase, owner, name=None):
+        self.stats = stats
+        self.key = (phase, ownername(owner), name)
+
+    def __enter__(self):
+        self.objects = self.stats.allocations and len(gc.get_objects())
+        self.start = time.time()
+
+    def __exit__(self, *exc_info):
+        seconds = time.time() - self.start
+        objects = self.stats.allocations and \
+                len(gc.get_objects()) - self.objects
+        self.stats.add(self.key, seconds, objects)
+
+
+def enable(allocations=True, atexit=False):
+    """Start profiling and return the stats records are added to
+
+    Counting objects walks all gc tracked objects, ``allocations=False``
+    records time only.
+    """
+    global stats
+    stats = Stats(allocations)
+    if atexit:
+        _atexit.register(stats.dump, 'phase', 'owner', stream=sys.stderr)
+    return stats
+
+
+def disable():
+    """Stop profiling and return the stats recorded
+    """
+    global stats
+    result, stats = stats, None
+    return result
+
+
+if os.environ.get('PLUMBER_PROFILE'):
+    enable(atexit=True) #pragma NO COVERAGE
@@ -0,0 +1,265 @@
+"""Benchmarks for plumbing class creation, pipeline calls and memory
+
+Run from the package directory::
+
+    python -m plumber.tests.benchmark            # compare with baselines
+    python -m plumber.tests.benchmark --save     # store new baselines
+
+Timings are microseconds per operation, the best of several repeats; memory
+is bytes of gc tracked objects. A benchmark regresses if it exceeds its
+baseline by more than the threshold (default 50%). The exit status is 1 if
+any benchmark regressed.
+
+Baselines are machine specific, store them on the machine you compare on.
+"""
+import gc
+import json
+import os
+import sys
+import timeit
+from optparse import OptionParser
+
+from plumber import Plumber
+from plumber import default
+from plumber._part import Part
+from plumber.attic import plumber
+from plumber.attic_instr import plumb
+from plumber.meta import cache
+from plumber.tools import Bases
+from plumber.tools import searchnameinbases
+
+BASELINES = os.path.join(os.path.dirname(__file__), 'benchmark.json')
+THRESHOLD = 0.5
+REPEAT = 7
+
+
+def best(func, number):
+    """Best time of func in microseconds per call
+    """
+    times = timeit.repeat(func, repeat=REPEAT, number=number)
+    return min(times) / number * 1e6
+
+
+def allocated(func):
+    """Bytes of gc tracked objects created by func and still alive
+    """
+    gc.collect()
+    before = set(id(x) for x in gc.get_objects())
+    before.add(id(before))
+    keep = func()
+    gc.collect()
+    size = sum(sys.getsizeof(x) for x in gc.get_objects()
+               if id(x) not in before)
+    del keep
+    return size
+
+
+####
+# Parts, plumbers and classes
+#
+
+def makeparts(count):
+    """count parts, each plumbing ``foo`` and providing a method of its own
+    """
+    parts = []
+    for i in range(count):
+        def foo(_next, self, value):
+            return _next(self, value) + 1
+        def bar(_next, self):
+            return _next(self)
+        parts.append(type(Part)('Part%i' % i, (Part,), {
+            'foo': plumb(foo),
+            'bar%i' % i: plumb(bar),
+            }))
+    return parts
+
+
+def makeplumbing(parts, compiled=False):
+    dct = dict(__plumbing__=tuple(parts),
+               foo=lambda self, value: value)
+    for i in range(len(parts)):
+        dct['bar%i' % i] = lambda self: None
+    plumb.compileall = compiled
+    try:
+        return plumber('Plumbing', (object,), dct)
+    finally:
+        plumb.compileall = False
+
+
+def makeplumber(attrs):
+    """A plumber with attrs default instructions
+    """
+    dct = dict(('a%i' % i, default(i)) for i in range(attrs))
+    return type(Plumber)('P', (Plumber,), dct)
+
+
+def makebase(depth, names=1):
+    """A class with depth base classes, each defining names attributes
+    """
+    base = object
+    for i in range(depth):
+        dct = dict(('a%i' % (i * names + j), i) for j in range(names))
+        base = type('Base%i' % i, (base,), dct)
+    return base
+
+
+def supercall(depth):
+    """The method foo of a class with depth super calls
+    """
+    class Base(object):
+        def foo(self, value):
+            return value
+    cls = Base
+    for i in range(depth):
+        cls = type('Super%i' % i, (cls,), {})
+        def bind(cls):
+            def foo(self, value):
+                return super(cls, self).foo(value) + 1
+            return foo
+        cls.foo = bind(cls)
+    return cls().foo
+
+
+####
+# Benchmarks
+#
+
+def bench_create_parts(count):
+    parts = makeparts(count)
+    return best(lambda: makeplumbing(parts), 200)
+
+
+def bench_create_attrs(attrs):
+    plumber = makeplumber(attrs)
+    base = makebase(1)
+    def create():
+        cache.clear()
+        plumber(base)
+    return best(create, 200)
+
+
+def bench_create_depth(depth):
+    plumber = makeplumber(10)
+    base = makebase(depth)
+    def create():
+        cache.clear()
+        plumber(base)
+    return best(create, 200)
+
+
+def bench_bases(lookups, index=True):
+    """lookups of missing names in a 30 deep base with 20 names per class
+
+    ``index=False`` searches the bases for each name, as without ``Bases``.
+    """
+    base = makebase(30, 20)
+    names = ['b%i' % i for i in range(lookups)]
+    if index:
+        def lookup():
+            bases = Bases(base)
+            for name in names:
+                name in bases
+    else:
+        def lookup():
+            for name in names:
+                searchnameinbases(name, (base,))
+    return best(lookup, 2000)
+
+
+def bench_call_plumb(depth, compiled=False):
+    foo = makeplumbing(makeparts(depth), compiled)().foo
+    return best(lambda: foo(1), 50000)
+
+
+def bench_call_super(depth):
+    foo = supercall(depth)
+    return best(lambda: foo(1), 50000)
+
+
+def bench_memory_class(count):
+    parts = makeparts(count)
+    return allocated(lambda: makeplumbing(parts))
+
+
+def bench_memory_instance(count):
+    cls = makeplumbing(makeparts(count))
+    return allocated(lambda: [cls() for i in range(1000)]) / 1000.
+
+
+BENCHMARKS = []
+for x in 1, 5, 20:
+    BENCHMARKS.append(('create_parts_%i' % x, bench_create_parts, (x,)))
+for x in 10, 50:
+    BENCHMARKS.append(('create_attrs_%i' % x, bench_create_attrs, (x,)))
+for x in 1, 10, 30:
+    BENCHMARKS.append(('create_depth_%i' % x, bench_create_depth, (x,)))
+for x in 1, 20:
+    BENCHMARKS.append(('bases_index_%i' % x, bench_bases, (x,)))
+    BENCHMARKS.append(('bases_search_%i' % x, bench_bases, (x, False)))
+for x in 1, 3, 6:
+    BENCHMARKS.append(('call_super_%i' % x, bench_call_super, (x,)))
+    BENCHMARKS.append(('call_plumb_%i' % x, bench_call_plumb, (x,)))
+    BENCHMARKS.append(('call_compiled_%i' % x, bench_call_plumb, (x, True)))
+for x in 1, 5:
+    BENCHMARKS.append(('memory_class_%i' % x, bench_memory_class, (x,)))
+    BENCHMARKS.append(('memory_instance_%i' % x, bench_memory_instance, (x,)))
+
+
+def run(names=None):
+    results = {}
+    for name, bench, args in BENCHMARKS:
+        if names and name not in names:
+            continue
+        results[name] = bench(*args)
+    return results
+
+
+def regressions(results, baselines, threshold=THRESHOLD):
+    """Names of the results exceeding their baseline by more than threshold
+
+        >>> regressions(dict(a=1.0, b=2.0, c=1.0), dict(a=1.0, b=1.0))
+        ['b']
+    """
+    return sorted(name for name, value in results.iteritems()
+                  if name in baselines
+                  and value > baselines[name] * (1 + threshold))
+
+
+def main(argv=None):
+    parser = OptionParser(usage="%prog [options] [benchmark ...]")
+    parser.add_option('--save', action='store_true',
+                      help="store the results as new baselines")
+    parser.add_option('--baselines', default=BASELINES,
+                      help="baselines file [%default]")
+    parser.add_option('--threshold', type='float', default=THRESHOLD,
+                      help="allowed relative regression [%default]")
+    options, names = parser.parse_args(argv)
+
+    results = run(names)
+    baselines = {}
+    if os.path.exists(options.baselines):
+        with open(options.baselines) as f:
+            baselines = json.load(f)
+    failed = regressions(results, baselines, options.threshold)
+    for name, bench, args in BENCHMARKS:
+        if name not in results:
+            continue
+        baseline = baselines.get(name)
+        line = "%-22s %12.2f" % (name, results[name])
+        if baseline:
+            line += " %12.2f %+7.1f%%" % (
+                    baseline, (float(results[name]) / baseline - 1) * 100)
+        if name in failed:
+            line += "  REGRESSION"
+        print line
+
+    if options.save:
+        baselines.update(results)
+        with open(options.baselines, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        return 0
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main()) #pragma NO COVERAGE
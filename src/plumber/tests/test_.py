@@ -9,11 +9,19 @@ optionflags = doctest.NORMALIZE_WHITESPACE | \
 
 TESTFILES = [
     '../plumber.rst',
+    'threads.rst',
 ]
 
 TESTMODULES = [
     'plumber._instructions',
+    'plumber.attic',
+    'plumber.attic_instr',
+    'plumber.caching',
     'plumber.meta',
+    'plumber.plancache',
+    'plumber.profiling',
+    'plumber.tools',
+    'plumber.tracing',
 ]
 
 def test_suite():
@@ -1,3 +1,8 @@
+import inspect
+import operator
+import types
+
+
 def searchnameinbases(name, bases):
     """
         >>> class A(object):
@@ -19,11 +24,313 @@ def searchnameinbases(name, bases):
     return False
 
 
+def mro(cls):
+    """The classes searched for attributes of cls, in order
+
+    For old-style classes the bases are searched depth-first, each class is
+    listed once::
+
+        >>> class A: pass
+        >>> class B(A): pass
+        >>> class C(A): pass
+        >>> class D(B, C): pass
+        >>> [x.__name__ for x in mro(D)]
+        ['D', 'B', 'A', 'C']
+    """
+    try:
+        return cls.__mro__
+    except AttributeError:
+        pass
+    result = []
+    todo = [cls]
+    while todo:
+        base = todo.pop()
+        if base in result:
+            continue
+        result.append(base)
+        todo.extend(reversed(base.__bases__))
+    return tuple(result)
+
+
+#: attributes type creates per class, not compared by ``fingerprint``
+OWNATTRS = ('__dict__', '__weakref__')
+
+
+def fingerprint(cls):
+    """What plumbing cls depends on: its bases, its own attributes and the
+    names defined along its mro
+
+    Compared by ``unchanged``. Does not reference cls::
+
+        >>> class A(object):
+        ...     a = 1
+        >>> class B(A):
+        ...     b = 1
+        >>> fp = fingerprint(B)
+        >>> unchanged(B, fp)
+        True
+        >>> B.b = True
+        >>> unchanged(B, fp)
+        False
+        >>> fp = fingerprint(B)
+        >>> A.c = 3
+        >>> unchanged(B, fp)
+        False
+    """
+    own = cls.__dict__
+    keys = own.keys()
+    values = [own[k] for k in keys if k not in OWNATTRS]
+    names = [x.__dict__.keys() for x in mro(cls)[1:]]
+    return cls.__bases__, keys, values, names
+
+
+def unchanged(cls, fingerprint):
+    """Whether cls still has the given fingerprint
+
+    Own attributes are compared by identity, names of the bases in order, a
+    reordered dict counts as changed.
+    """
+    bases, keys, values, names = fingerprint
+    own = cls.__dict__
+    if cls.__bases__ is not bases or own.keys() != keys:
+        return False
+    current = [own[k] for k in keys if k not in OWNATTRS]
+    if any(map(operator.is_not, current, values)):
+        return False
+    return [x.__dict__.keys() for x in mro(cls)[1:]] == names
+
+
+def signature(func, skip=0):
+    """Names of the positional arguments of func and their defaults
+
+    The first ``skip`` arguments are omitted. ``None`` is returned, if func
+    cannot be inspected or takes more than plain positional arguments::
+
+        >>> signature(lambda _next, self, key, default=None: None, 2)
+        (('key', 'default'), (None,))
+        >>> signature(lambda _next, self: None, 2)
+        ((), ())
+        >>> signature(lambda _next, self, *args, **kw: None, 2) is None
+        True
+        >>> signature(dict.__getitem__) is None
+        True
+    """
+    func = getattr(func, 'im_func', func)
+    try:
+        args, varargs, varkw, defaults = inspect.getargspec(func)
+    except TypeError:
+        return None
+    defaults = defaults or ()
+    if varargs or varkw or len(args) - len(defaults) < skip:
+        return None
+    for name in args:
+        # tuple parameters and names clashing with generated code
+        if type(name) is not str or name.startswith('_plb_'):
+            return None
+    return tuple(args[skip:]), tuple(defaults)
+
+
+_CURRIED = """
+def factory(_plb_func, _plb_c, _plb_d):
+    def curried(%(params)s):
+        return _plb_func(%(args)s)
+    return curried
+"""
+
+
+def curry(func, cargs=(), defkw={}):
+    """Curry positional arguments and default keywords into func
+
+    ``cargs`` are passed after the first argument (``self``), ``defkw``
+    become the defaults of the keyword arguments. For functions with plain
+    positional arguments a function with the remaining arguments and the
+    merged defaults is generated, nothing is merged per call::
+
+        >>> def __init__(self, a, b, c=1, d=2):
+        ...     "init"
+        ...     return a, b, c, d
+        >>> curried = curry(__init__, (10,), dict(d=5))
+        >>> inspect.getargspec(curried)
+        ArgSpec(args=['self', 'b', 'c', 'd'], varargs=None, keywords=None,
+                defaults=(1, 5))
+        >>> curried(None, 2), curried(None, 2, d=7)
+        ((10, 2, 1, 5), (10, 2, 1, 7))
+        >>> curried.__name__, curried.__doc__
+        ('__init__', 'init')
+
+    Other functions get the curried arguments added per call::
+
+        >>> def __init__(self, *args, **kw):
+        ...     return args, kw
+        >>> curried = curry(__init__, (10,), dict(d=5))
+        >>> curried(None, 2, e=3)
+        ((10, 2), {'e': 3, 'd': 5})
+
+    Currying a class creates a subclass with a curried ``__init__``::
+
+        >>> class A(object):
+        ...     def __init__(self, a, b=2):
+        ...         self.ab = a, b
+        >>> B = curry(A, (), dict(b=3))
+        >>> B, B(1).ab
+        (<class 'plumber.tools.A'>, (1, 3))
+    """
+    if isinstance(func, (type, types.ClassType)):
+        init = getattr(func.__init__, 'im_func', func.__init__)
+        return type(func)(func.__name__, (func,), {
+            '__init__': curry(init, cargs, defkw),
+            '__module__': func.__module__,
+            })
+    sig = signature(func, 1 + len(cargs))
+    if sig is not None:
+        names, defaults = sig
+        defaults = dict(zip(names[len(names) - len(defaults):], defaults))
+        defaults.update(defkw)
+        # defaults need to be trailing and defkw known arguments
+        ndefaults = len(defaults)
+        if ndefaults <= len(names) and \
+                set(defaults) == set(names[len(names) - ndefaults:]):
+            curried = generatecurried(func, len(cargs), names, ndefaults)(
+                    func, tuple(cargs),
+                    tuple(defaults[x] for x in names[len(names) - ndefaults:]))
+            curried.__name__ = func.__name__
+            curried.__doc__ = func.__doc__
+            return curried
+    cargs = tuple(cargs)
+    defkw = dict(defkw)
+    def curried(self, *args, **kw):
+        if defkw:
+            kw = dict(defkw, **kw)
+        return func(self, *(cargs + args), **kw)
+    curried.__name__ = func.__name__
+    curried.__doc__ = func.__doc__
+    return curried
+
+
+_curried = {}
+
+
+def generatecurried(func, ncargs, names, ndefaults):
+    """Compile a factory for curried functions, once per signature
+    """
+    self = signature(func)[0][0]
+    key = (self, ncargs, names, ndefaults)
+    try:
+        return _curried[key]
+    except KeyError:
+        pass
+    params = [self] + list(names)
+    for i in range(ndefaults):
+        idx = len(params) - ndefaults + i
+        params[idx] = "%s=_plb_d[%i]" % (params[idx], i)
+    args = [self] + ['_plb_c[%i]' % i for i in range(ncargs)] + list(names)
+    ns = dict()
+    exec _CURRIED % dict(params=', '.join(params), args=', '.join(args)) in ns
+    factory = _curried[key] = ns['factory']
+    return factory
+
+
+def implementedby(cls):
+    """Tuple of the interfaces implemented by cls
+
+    ``zope.interface`` is imported only, if cls or one of its bases declares
+    interfaces::
+
+        >>> class A(object):
+        ...     pass
+        >>> implementedby(A)
+        ()
+
+        >>> from zope.interface import Interface
+        >>> from zope.interface import implements
+        >>> class IB(Interface):
+        ...     pass
+        >>> class B(A):
+        ...     implements(IB)
+        >>> class C(B):
+        ...     pass
+        >>> implementedby(C)
+        (<InterfaceClass plumber.tools.IB>,)
+    """
+    if getattr(cls, '__implemented__', None) is None:
+        return ()
+    from zope.interface import implementedBy
+    return tuple(implementedBy(cls))
+
+
+def classimplements(cls, interfaces):
+    """Declare that cls implements interfaces, if there are any
+    """
+    if interfaces:
+        from zope.interface import classImplements
+        classImplements(cls, *interfaces)
+
+
+def mergeinterfaces(*interfaces):
+    """Tuple of the given interfaces, each listed once
+
+        >>> mergeinterfaces(('a', 'b'), ('c', 'a'), ())
+        ('a', 'b', 'c')
+    """
+    result = []
+    seen = set()
+    for ifaces in interfaces:
+        for iface in ifaces:
+            if iface not in seen:
+                seen.add(iface)
+                result.append(iface)
+    return tuple(result)
+
+
 class Bases(object):
     """Used to search in base classes for attributes
+
+        >>> class A(object):
+        ...     foo = 1
+        >>> class B(object):
+        ...     bar = 2
+        >>> bases = Bases(A, B)
+        >>> 'foo' in bases, 'bar' in bases, 'baz' in bases
+        (True, True, False)
+
+    The first ``INDEXAFTER`` lookups search the dicts of the classes along
+    the mros. Later ones are a single set lookup in the names of all of them,
+    indexed once. A ``Bases`` lives for one resolution, changes to the
+    classes after it indexed them are not seen::
+
+        >>> bases.names is None
+        True
+        >>> 'bar' in bases, 'foo' in bases
+        (True, True)
+        >>> sorted(bases.names - set(object.__dict__))
+        ['__dict__', '__module__', '__weakref__', 'bar', 'foo']
     """
+    INDEXAFTER = 3
+
     def __init__(self, *bases):
         self.bases = bases
+        self.dicts = None
+        self.names = None
+        self.lookups = 0
 
     def __contains__(self, name):
-        return searchnameinbases(name, self.bases)
+        names = self.names
+        if names is not None:
+            return name in names
+        dicts = self.dicts
+        if dicts is None:
+            dicts = self.dicts = []
+            seen = set()
+            for base in self.bases:
+                for cls in mro(base):
+                    if cls not in seen:
+                        seen.add(cls)
+                        dicts.append(cls.__dict__)
+        self.lookups += 1
+        if self.lookups > self.INDEXAFTER:
+            names = self.names = frozenset().union(*dicts)
+            return name in names
+        for dct in dicts:
+            if name in dct:
+                return True
+        return False
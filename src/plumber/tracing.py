@@ -0,0 +1,201 @@
+"""Opt-in tracing of plumb pipelines
+
+Method pipelines installed by ``plumb`` are registered per plumbing class.
+While tracing is disabled the registered entrances are called as they are,
+tracing does not add a frame. ``enable`` replaces the entrances of all
+plumbing classes by traced ones, ``disable`` puts the original ones back, no
+class is rebuilt::
+
+    >>> from plumber import tracing
+    >>> from plumber.attic import plumber
+    >>> from plumber.attic_instr import plumb
+    >>> from plumber._part import Part
+
+    >>> class Cache(Part):
+    ...     @plumb
+    ...     def __getitem__(_next, self, key):
+    ...         return _next(self, key.lower())
+
+    >>> class Storage(dict):
+    ...     __metaclass__ = plumber
+    ...     __plumbing__ = Cache
+
+    >>> plain = Storage.__dict__['__getitem__']
+    >>> tracing.enable()
+    >>> Storage.__dict__['__getitem__'] is plain
+    False
+    >>> storage = Storage(abc=1)
+    >>> storage['ABC'], storage['aBc']
+    (1, 1)
+    >>> tracing.disable()
+    >>> Storage.__dict__['__getitem__'] is plain
+    True
+
+Per class, the number of calls, the cumulative and the own time of each
+stage are recorded. Stages are named after the part they come from, the
+endpoint after the plumbing class::
+
+    >>> for name, stage, calls, cumulative, own in tracing.statsfor(Storage):
+    ...     print name, stage, calls
+    __getitem__ plumber.tracing.Cache 2
+    __getitem__ plumber.tracing.Storage 2
+
+``export`` writes all records in the format of ``cProfile``, to be read by
+``pstats`` and tools based on it::
+
+    >>> import os, pstats, tempfile
+    >>> filename = tempfile.mktemp()
+    >>> tracing.export(filename)
+    >>> pstats.Stats(filename).total_calls
+    4
+    >>> os.remove(filename)
+
+``reset`` drops the records.
+"""
+import marshal
+import threading
+import time
+import weakref
+
+from plumber.profiling import ownername
+
+
+timer = time.time
+
+enabled = False
+
+# plumbing class -> {name: (instruction, endpoint, entrance)}
+_pipelines = weakref.WeakKeyDictionary()
+
+# plumbing class -> {name: [Record, ...]}
+_records = weakref.WeakKeyDictionary()
+
+_local = threading.local()
+
+
+class Record(object):
+    """Calls, cumulative and own time of one stage of a pipeline
+    """
+    __slots__ = ('stage', 'func', 'calls', 'cumulative', 'own')
+
+    def __init__(self, stage, func):
+        self.stage = stage
+        self.func = func
+        self.calls = 0
+        self.cumulative = 0.
+        self.own = 0.
+
+
+def traced(func, record, endpoint=False):
+    """func recording its calls to record
+
+    The time spent in nested traced stages is subtracted from the own time.
+    """
+    def stage(_next, self, *args, **kw):
+        try:
+            stack = _local.stack
+        except AttributeError:
+            stack = _local.stack = []
+        stack.append(0.)
+        start = timer()
+        try:
+            if endpoint:
+                return func(self, *args, **kw)
+            return func(_next, self, *args, **kw)
+        finally:
+            elapsed = timer() - start
+            nested = stack.pop()
+            record.calls += 1
+            record.cumulative += elapsed
+            record.own += elapsed - nested
+            if stack:
+                stack[-1] += elapsed
+    stage.__name__ = getattr(func, '__name__', 'stage')
+    return stage
+
+
+def recordsfor(cls, name, stages):
+    """The records of a pipeline, created on first use
+
+    ``stages`` are tuples of name and function, a pipeline built anew reuses
+    the existing records.
+    """
+    pipelines = _records.setdefault(cls, {})
+    records = pipelines.get(name)
+    if records is None or [x.stage for x in records] != [x[0] for x in stages]:
+        records = pipelines[name] = [Record(*x) for x in stages]
+    return records
+
+
+def register(cls, name, instruction, endpoint, entrance):
+    """Register the pipeline installed as ``cls.name``
+
+    Called by ``plumb`` in stage2, the entrance is replaced by a traced one,
+    if tracing is enabled.
+    """
+    _pipelines.setdefault(cls, {})[name] = (instruction, endpoint, entrance)
+    if enabled:
+        setattr(cls, name, instruction.traced(cls, endpoint))
+
+
+def enable():
+    """Trace all pipelines, existing ones and the ones created from now on
+    """
+    global enabled
+    enabled = True
+    for cls, pipelines in _pipelines.items():
+        for name, (instruction, endpoint, entrance) in pipelines.items():
+            if cls.__dict__.get(name) is entrance:
+                setattr(cls, name, instruction.traced(cls, endpoint))
+
+
+def disable():
+    """Put the untraced entrances back
+    """
+    global enabled
+    enabled = False
+    for cls, pipelines in _pipelines.items():
+        for name, (instruction, endpoint, entrance) in pipelines.items():
+            current = cls.__dict__.get(name)
+            if getattr(current, '__plumbing_traced__', False):
+                setattr(cls, name, entrance)
+
+
+def statsfor(cls):
+    """Tuples of name, stage, calls, cumulative and own seconds for cls
+    """
+    result = []
+    for name, records in sorted(_records.get(cls, {}).items()):
+        for x in records:
+            result.append((name, x.stage, x.calls, x.cumulative, x.own))
+    return result
+
+
+def reset():
+    """Drop all records
+    """
+    _records.clear()
+
+
+def export(filename):
+    """Write the records to filename in the format of ``cProfile``
+
+    Each stage is a function named ``<class>.<name> <stage>``, its caller is
+    the stage before it.
+    """
+    stats = {}
+    for cls, pipelines in _records.items():
+        for name, records in pipelines.items():
+            caller = None
+            for x in records:
+                code = getattr(x.func, 'func_code', None)
+                key = (code and code.co_filename or '~',
+                       code and code.co_firstlineno or 0,
+                       '%s.%s %s' % (ownername(cls), name, x.stage))
+                callers = {}
+                if caller is not None:
+                    callers[caller] = (x.calls, x.calls, x.own, x.cumulative)
+                stats[key] = (x.calls, x.calls, x.own, x.cumulative, callers)
+                caller = key
+    with open(filename, 'wb') as f:
+        marshal.dump(stats, f)